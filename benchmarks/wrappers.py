@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Microbenchmark of the Item and Collection wrappers properties.
+
+Reads ``item.properties['datetime']``, ``item.geometry.type`` and
+``collection.extent.spatial.bbox`` in a loop, as done over large search
+results, and compares the cached wrappers with building a new one on each
+access (the previous behaviour).
+
+Usage:
+
+    python benchmarks/wrappers.py [--items 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import timeit
+
+import stac
+from stac.collection import Extent
+from stac.item import Geometry, Properties
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'tests', 'stac_tests', 'jsons', '0.9.0')
+
+
+def load(name):
+    """Load a STAC document of the tests."""
+    with open(os.path.join(DATA, name)) as f:
+        return json.load(f)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000, help='The number of Items.')
+    parser.add_argument('--repeat', type=int, default=5, help='The number of runs, the best one is reported.')
+    args = parser.parse_args()
+
+    feature = load('items.json')['features'][0]
+    items = [stac.Item(dict(feature, id=str(index))) for index in range(args.items)]
+    collection = stac.Collection(load('collection.json'))
+
+    cases = {
+        'item.properties["datetime"]': (
+            lambda: [item.properties['datetime'] for item in items],
+            lambda: [Properties(item['properties'])['datetime'] for item in items]),
+        'item.geometry.type': (
+            lambda: [item.geometry.type for item in items],
+            lambda: [Geometry(item['geometry']).type for item in items]),
+        'collection.extent.spatial.bbox': (
+            lambda: [collection.extent.spatial.bbox for _ in items],
+            lambda: [Extent(collection['extent']).spatial.bbox for _ in items]),
+    }
+
+    print(f'{args.items} accesses, best of {args.repeat} runs')
+    for name, (cached, rebuilt) in cases.items():
+        cached_time = min(timeit.repeat(cached, number=1, repeat=args.repeat))
+        rebuilt_time = min(timeit.repeat(rebuilt, number=1, repeat=args.repeat))
+        print(f'{name:32} cached {cached_time * 1000:8.2f} ms  '
+              f'rebuilt {rebuilt_time * 1000:8.2f} ms  x{rebuilt_time / cached_time:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -37,16 +37,19 @@ tests_require = [
 
 examples_require = [
     'matplotlib>=3.1',
-    'numpy>=1.18'
+    'numpy>=1.18',
     'rasterio>=1.1',
 ]
 
 extras_require = {
+    'arrow': ['pyarrow>=4.0'],
+    'async': ['httpx>=0.18'],
     'docs': docs_require,
     'examples': examples_require,
     'oauth': ['requests_oauthlib>=1.3'],
     'tests': tests_require,
     'tqdm': ['tqdm>=4.49.0'],
+    'xarray': ['xarray>=0.16'],
     'geo': [
         'rasterio>=1.1',
     ]
@@ -8,16 +8,34 @@
 
 """Python Client Library for STAC."""
 
-from . import cli
+import importlib
+
+from .cache import DiskCache, MemoryCache
 from .catalog import Catalog
 from .collection import Collection, Extent, Provider
 from .common import Link
+from .compact import CompactItem
+from .federation import FederatedSTAC
 from .item import Geometry, Item, ItemCollection
+from .session import RateLimiter, RetryPolicy, Session
 from .stac import STAC
 from .utils import Utils
 from .version import __version__
 
 __all__ = ('__version__',
-           'STAC', 'Catalog', 'Collection', 'Extent',
+           'STAC', 'AsyncSTAC', 'Catalog', 'Collection', 'Extent',
            'Provider', 'Link', 'Item', 'ItemCollection',
-           'Geometry')
+           'Geometry', 'Session', 'DiskCache', 'MemoryCache',
+           'FederatedSTAC', 'RateLimiter', 'RetryPolicy', 'CompactItem')
+
+_lazy = {'cli': ('.cli', None), 'AsyncSTAC': ('.aio', 'AsyncSTAC')}
+
+
+def __getattr__(name):
+    """Import the command line interface and the asynchronous client on first access."""
+    if name not in _lazy:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    module_name, attribute = _lazy[name]
+    module = importlib.import_module(module_name, __name__)
+    return getattr(module, attribute) if attribute else module
@@ -0,0 +1,293 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Asynchronous Python API client wrapper for STAC."""
+
+import asyncio
+import contextlib
+
+from .catalog import Catalog
+from .collection import Collection
+from .item import Item, ItemCollection
+from .pagination import Paginator
+from .utils import Utils
+
+
+class AsyncSTAC:
+    """This class implements an asyncio Python API client wrapper for STAC.
+
+    It mirrors :class:`stac.STAC`, returning the same model objects, but each
+    request is a coroutine and the number of requests in flight is limited by
+    a semaphore.
+
+    Notes:
+        You must install the extra `async` containing the `httpx` library
+        in order to use this class:
+
+            pip install stac.py[async]
+
+    :param url: URL for the Root STAC Catalog.
+    :type url: str
+    """
+
+    def __init__(self, url, validate=False, access_token=None, client=None, max_concurrency=100,
+                 rate_limiter=None, **client_kwargs):
+        """Create an asynchronous STAC client attached to the given host address (an URL).
+
+        :param url: URL for the Root STAC Catalog.
+        :type url: str
+        :param validate: True if responses should ve validated
+        :type validate: bool
+        :param access_token: Authentication for the STAC API
+        :type access_token: str
+        :param client: (optional) The ``httpx.AsyncClient`` used to send the requests.
+            If None, a client is created with the given ``client_kwargs``.
+        :param max_concurrency: The maximum number of requests in flight. Default is 100.
+        :type max_concurrency: int
+        :param rate_limiter: (optional) The per host limit of the requests, see :class:`stac.session.RateLimiter`.
+        :type rate_limiter: stac.session.RateLimiter
+        """
+        import httpx
+
+        self._url = url.rstrip('/')
+        self._collections = dict()
+        self._catalog = dict()
+        self._validate = validate
+        self._access_token = f'?access_token={access_token}' if access_token else ''
+        self._client = client or httpx.AsyncClient(**client_kwargs)
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+        self._rate_limiter = rate_limiter
+
+    async def _get(self, url, params=None, method=None):
+        """Query the STAC service and return the result as a JSON document."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        method = method or Utils._search_method(params)
+
+        async with self._semaphore, self._limit(url):
+            if method == 'POST':
+                response = await self._client.post(url, json=params)
+            else:
+                response = await self._client.get(url, params=params)
+
+        return Utils._json(response)
+
+    @contextlib.asynccontextmanager
+    async def _limit(self, url):
+        """Hold a request to the rate limiter, if any."""
+        if self._rate_limiter is None:
+            yield
+            return
+
+        async with self._rate_limiter.limit_async(url):
+            yield
+
+    @property
+    def _collections_url(self):
+        """Return the URL of the collections endpoint."""
+        url = '/'.join(self._url.split('/')[:-1]) if self._url.endswith('/stac') else self._url
+        return f'{url.rstrip("/")}/collections'
+
+    async def conformance(self): # pragma: no cover
+        """Return the list of conformance classes that the server conforms to."""
+        return await self._get('{}/conformance'.format(self._url))
+
+    async def catalog(self):
+        """Retrieve the available collections in the STAC Catalog.
+
+        The root catalog and the collections are requested concurrently.
+
+        :return list of available collections.
+        """
+        async def fetch_catalog():
+            self._catalog = Catalog(await self._get(f'{self._url}{self._access_token}'), self._validate)
+
+        pending = []
+        if not self._catalog:
+            pending.append(fetch_catalog())
+        if not self._collections:
+            pending.append(self.collections())
+        await asyncio.gather(*pending)
+
+        for i in self._catalog.links:
+            if i.rel == 'child':
+                if '?' in i.href:  # pragma: no cover
+                    collection_name = i.href.split('/')[-1]
+                    self._collections.setdefault(collection_name[:collection_name.index('?')], None)
+                else:
+                    self._collections.setdefault(i.href.split('/')[-1], None)
+        return list(self._collections.keys())
+
+    async def collections(self):
+        """Return all available collections.
+
+        :returns: A dict containing all collections.
+        :rype: dict
+        """
+        data = await self._get(f'{self._collections_url}{self._access_token}')
+        self._collections = {collection['id']: Collection(collection, self._validate)
+                             for collection in data['collections']}
+
+        return self._collections
+
+    async def collection(self, collection_id) -> Collection:
+        """Return the given collection.
+
+        :param collection_id: A str for a given collection_id.
+        :type collection_id: str
+
+        :returns: A STAC Collection.
+        :rtype: dict
+        """
+        from httpx import HTTPError
+
+        if self._collections.get(collection_id) is not None:
+            return self._collections[collection_id]
+        try:
+            data = await self._get(f'{self._collections_url}/{collection_id}{self._access_token}')
+            self._collections[collection_id] = Collection(data, self._validate)
+        except HTTPError:
+            raise KeyError(f'Could not retrieve information for collection: {collection_id}')
+        return self._collections[collection_id]
+
+    async def item(self, collection_id, item_id) -> Item:
+        """Return the given item of a collection.
+
+        :param collection_id: A str for a given collection_id.
+        :type collection_id: str
+        :param item_id: A str with a STAC Item id.
+        :type item_id: str
+
+        :returns: A STAC Item.
+        :rtype: Item
+        """
+        data = await self._get(f'{self._collections_url}/{collection_id}/items/{item_id}{self._access_token}')
+        return Item(data, self._validate)
+
+    async def search(self, lazy=False, **query):
+        """Retrieve Items matching a filter.
+
+        :param lazy: true if the Items should only be built when accessed. Default is False.
+        :type lazy: bool
+        :param query: (optional) A dictionary with valid STAC query parameters from query kwarg.
+        :type query: dict
+
+        :returns: A GeoJSON FeatureCollection.
+        :rtype: ItemCollection
+        """
+        if not self._catalog:  # pragma: no cover
+            await self.catalog()
+
+        if 'bbox' in query:
+            query['bbox'] = Utils.build_bbox_as_str(query['bbox'])
+
+        data = await self._get(f'{self._url}/search{self._access_token}', params=query)
+        return ItemCollection(data, self._validate, lazy=lazy)
+
+    async def search_iter(self, max_items=None, **query):
+        """Iterate over all Items matching a filter, following the result pages.
+
+        :param max_items: (optional) The maximum number of Items to return.
+        :type max_items: int
+        :param query: (optional) A dictionary with valid STAC query parameters from query kwarg.
+        :type query: dict
+
+        :returns: An asynchronous iterator of STAC Items.
+        :rtype: AsyncIterator[Item]
+        """
+        if not self._catalog:  # pragma: no cover
+            await self.catalog()
+
+        if 'bbox' in query:
+            query['bbox'] = Utils.build_bbox_as_str(query['bbox'])
+
+        async for item in self._iter_items(f'{self._url}/search{self._access_token}', query, max_items,
+                                           self._catalog.get('stac_version')):
+            yield item
+
+    async def iter_items(self, collection_id, filter=None, max_items=None):
+        """Iterate over all items of a collection, following the result pages.
+
+        :param collection_id: A str for a given collection_id.
+        :type collection_id: str
+        :param filter: (optional) A dictionary with valid STAC query parameters.
+        :type filter: dict
+        :param max_items: (optional) The maximum number of items to return.
+        :type max_items: int
+
+        :returns: An asynchronous iterator of STAC Items.
+        :rtype: AsyncIterator[Item]
+        """
+        collection = await self.collection(collection_id)
+
+        if filter is not None and 'bbox' in filter:
+            filter['bbox'] = Utils.build_bbox_as_str(filter['bbox'])
+
+        for link in collection.links:
+            if link.rel == 'items':
+                async for item in self._iter_items(link.href, filter, max_items, collection.get('stac_version')):
+                    yield item
+                return
+
+    async def _iter_items(self, url, params, max_items, stac_version=None):
+        """Yield the Items of each page, following the ``next`` links, see :class:`stac.pagination.Paginator`."""
+        if max_items is not None and max_items <= 0:
+            return
+
+        count = 0
+        request = (url, dict(params) if params is not None else None, None)
+        previous_ids = None
+
+        while request is not None:
+            page = ItemCollection(await self._get(*request), self._validate, lazy=True)
+
+            ids = Paginator._page_ids(page)
+            if ids and ids == previous_ids:
+                return
+            previous_ids = ids
+
+            for item in page.features:
+                yield item
+
+                count += 1
+                if max_items is not None and count >= max_items:
+                    return
+
+            if not page.features:
+                return
+
+            next_request = Paginator._next_request(page, *request, stac_version)
+            if next_request == request:
+                return
+            request = next_request
+
+    @property
+    def url(self):
+        """Return the STAC server instance URL."""
+        return self._url
+
+    async def close(self):
+        """Close the underlying HTTP client."""
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        """Enter the runtime context of an asynchronous STAC client."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the asynchronous STAC client when leaving the runtime context."""
+        await self.close()
+
+    def __repr__(self):
+        """Return the string representation of an AsyncSTAC object."""
+        return 'AsyncSTAC("{}")'.format(self.url)
+
+    def __str__(self):
+        """Return the string representation of an AsyncSTAC object."""
+        return '<AsyncSTAC [{}]>'.format(self.url)
@@ -0,0 +1,277 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Caches for STAC responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from email.utils import parsedate_to_datetime
+
+AUTH_HEADERS = ('authorization', 'proxy-authorization', 'cookie', 'x-api-key')
+"""The request headers identifying the client, which are part of the cache key."""
+
+MEMORY_CACHE_TTL = 60
+"""The number of seconds the Collections and Items are kept by the default memory cache of :class:`stac.STAC`."""
+
+CachedResponse = namedtuple('CachedResponse', ['data', 'fresh', 'validators'])
+"""A cached JSON document, whether it may be used without revalidation, and its conditional request headers."""
+
+
+class DiskCache:
+    """A persistent cache of the JSON documents returned by GET requests.
+
+    The responses are stored in a SQLite database, shared by every process using the
+    same file. The freshness of an entry follows the ``Cache-Control`` (``max-age``,
+    ``no-cache``, ``no-store``) and ``Expires`` response headers, or ``default_ttl``
+    when they are absent. Stale entries holding an ``ETag`` or ``Last-Modified``
+    header are revalidated with a conditional request. The responses of requests
+    sent with different credentials (see :data:`AUTH_HEADERS`) are cached apart. When the database grows over
+    ``max_size`` bytes, the least recently used entries are evicted.
+
+    To use it, give it to the STAC client::
+
+        service = STAC(url, cache=DiskCache('/tmp/stac-cache.sqlite'))
+    """
+
+    def __init__(self, path=None, max_size=100 * 1024 * 1024, default_ttl=0):
+        """Open (or create) the cache database.
+
+        :param path: (optional) The SQLite database path. Defaults to ``~/.cache/stac.py/http.sqlite``.
+        :type path: str
+        :param max_size: The maximum size in bytes of the cached documents. Default is 100 MiB.
+        :type max_size: int
+        :param default_ttl: The number of seconds a response without freshness headers is used
+            without revalidation. Default is 0.
+        :type default_ttl: float
+        """
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.cache', 'stac.py', 'http.sqlite')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self._path = path
+        self._max_size = max_size
+        self._default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS responses ('
+                                 'key TEXT PRIMARY KEY, url TEXT, body BLOB, validators TEXT, '
+                                 'expires REAL, size INTEGER, accessed REAL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    @property
+    def path(self):
+        """:return: the SQLite database path."""
+        return self._path
+
+    @staticmethod
+    def key(url, params=None, headers=None):
+        """Return the cache key of a GET request.
+
+        :param url: The request URL.
+        :type url: str
+        :param params: (optional) The query string parameters.
+        :type params: dict
+        :param headers: (optional) The request headers, only the ones of :data:`AUTH_HEADERS` are used.
+        :type headers: dict
+
+        :rtype: str
+        """
+        credentials = {name.lower(): value for name, value in (headers or {}).items()
+                       if name.lower() in AUTH_HEADERS}
+        request = json.dumps([url, params, credentials] if credentials else [url, params],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached response of a request key, or None.
+
+        :param key: The cache key, see :meth:`key`.
+        :type key: str
+
+        :rtype: CachedResponse
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT body, validators, expires FROM responses WHERE key = ?',
+                                           (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+
+        body, validators, expires = row
+        return CachedResponse(json.loads(body), expires > time.time(), json.loads(validators))
+
+    def _expires(self, headers):
+        """Return the timestamp until which a response is fresh, or None if it must not be stored."""
+        directives = dict()
+        for directive in headers.get('cache-control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            if name:
+                directives[name.lower()] = value.strip('"')
+
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0
+        if directives.get('max-age', '').isdigit():
+            return time.time() + int(directives['max-age'])
+        if headers.get('expires'):
+            try:
+                return parsedate_to_datetime(headers['expires']).timestamp()
+            except (TypeError, ValueError):
+                return 0
+        return time.time() + self._default_ttl
+
+    def set(self, key, url, data, headers):
+        """Store the JSON document of a response.
+
+        :param key: The cache key, see :meth:`key`.
+        :type key: str
+        :param url: The request URL.
+        :type url: str
+        :param data: The JSON document.
+        :type data: dict
+        :param headers: The response headers.
+        """
+        expires = self._expires(headers)
+        validators = {name: headers[header] for name, header in (('If-None-Match', 'etag'),
+                                                                   ('If-Modified-Since', 'last-modified'))
+                      if headers.get(header)}
+
+        if expires is None or (expires <= time.time() and not validators):
+            return
+
+        body = json.dumps(data).encode()
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                     (key, url, body, json.dumps(validators), expires, len(body), time.time()))
+            self._evict()
+
+    def revalidate(self, key, headers):
+        """Renew the freshness of an entry after a ``304 Not Modified`` response.
+
+        :param key: The cache key, see :meth:`key`.
+        :type key: str
+        :param headers: The response headers.
+        """
+        expires = self._expires(headers)
+        with self._lock:
+            if expires is None:
+                self._connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+            else:
+                self._connection.execute('UPDATE responses SET expires = ?, accessed = ? WHERE key = ?',
+                                         (expires, time.time(), key))
+
+    def _evict(self):
+        """Delete the least recently used entries until the cache fits in ``max_size``."""
+        size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if size <= self._max_size:
+            return
+
+        rows = self._connection.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+        evicted = list()
+        for key, entry_size in rows:
+            if size <= self._max_size:
+                break
+            evicted.append((key,))
+            size -= entry_size
+        self._connection.executemany('DELETE FROM responses WHERE key = ?', evicted)
+
+    def clear(self):
+        """Remove all the cached responses."""
+        with self._lock:
+            self._connection.execute('DELETE FROM responses')
+
+    def __len__(self):
+        """Return the number of cached responses."""
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def close(self):
+        """Close the cache database."""
+        self._connection.close()
+
+
+class MemoryCache:
+    """A thread-safe in-memory cache with a time to live and a maximum number of entries.
+
+    Expired entries are dropped on access and, when full, the least recently used
+    entry is evicted. The number of hits and misses is counted.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None):
+        """Create an empty cache.
+
+        :param max_entries: (optional) The maximum number of entries, None for no limit. Default is 1024.
+        :type max_entries: int
+        :param ttl: (optional) The number of seconds an entry is kept, None for no expiration. Default is None.
+        :type ttl: float
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Return the value of a key, or ``default`` if it is missing or expired.
+
+        :param key: A hashable key.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """Store the value of a key, evicting the least recently used entry when full.
+
+        :param key: A hashable key.
+        """
+        expires = time.monotonic() + self._ttl if self._ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            if self._max_entries is not None:
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove a key and return its value, or ``default`` if it is missing."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        """Remove all the entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        """Return the number of entries, including the expired ones not yet dropped."""
+        return len(self._entries)
+
+    def __repr__(self):
+        """Return the string representation of a MemoryCache object."""
+        return f'<MemoryCache [{len(self)} entries, {self.hits} hits, {self.misses} misses]>'
@@ -7,10 +7,6 @@
 #
 """STAC Catalog module."""
 
-import json
-
-from pkg_resources import resource_string
-
 from .common import Link
 from .utils import Utils
 
@@ -27,10 +23,8 @@ class Catalog(dict):
         self._validate = validate
         super(Catalog, self).__init__(data or {})
 
-        self._schema = json.loads(resource_string(__name__, f'jsonschemas/{self.stac_version}/catalog.json'))
-
         if self._validate:
-            Utils.validate(self)
+            Utils.validate(self, 'catalog')
 
         self._links = [Link(link) for link in self['links']] if 'links' in self else []
 
@@ -62,4 +56,4 @@ class Catalog(dict):
     @property
     def schema(self):
         """:return: the Catalog jsonschema."""
-        return self._schema
+        return Utils.schema(self.stac_version, 'catalog')
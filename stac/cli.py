@@ -8,12 +8,55 @@
 
 """Command line interface for the STAC client."""
 import json
+import os
 
 import click
 
+from .download import DownloadManager
+from .session import Session
 from .stac import STAC
 
 
+def _project(feature, fields):
+    """Return a feature with only the given dotted fields, e.g. ``properties.datetime``."""
+    if not fields:
+        return feature
+
+    projected = dict()
+    for field in fields:
+        keys = field.split('.')
+        value = feature
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = projected
+            for key in keys[:-1]:
+                target = target.setdefault(key, dict())
+            target[keys[-1]] = value
+
+    return projected
+
+
+def _echo_features(features, fields=None):
+    """Print each feature as a compact JSON document on its own line (NDJSON)."""
+    fields = [field.strip() for field in fields.split(',')] if fields else None
+    for feature in features:
+        click.echo(json.dumps(_project(feature, fields), separators=(',', ':')))
+
+
+def _stream_options(command):
+    """Add the options printing the items as NDJSON to a command."""
+    command = click.option('--fields', default=None,
+                           help='Comma separated item fields to print, e.g. id,properties.datetime (NDJSON).')(command)
+    command = click.option('--max-items', default=None, type=int,
+                           help='The maximum number of items to print, one JSON item per line (NDJSON).')(command)
+    command = click.option('--all', 'all_items', is_flag=True, default=False,
+                           help='Follow the result pages and print one JSON item per line (NDJSON).')(command)
+    return command
+
+
 @click.group()
 def cli():
     """STAC on command line."""
@@ -51,15 +94,24 @@ def collection(url, collection_id, access_token=None):
 @click.option('--datetime', help='Single date, date+time, or a range (\'/\' seperator), formatted to RFC 3339, section 5.6')
 @click.option('--bbox', default=None, help='Requested bounding box west, south, east, north')
 @click.option('--access-token', default=None, help='Personal Access Token of the BDC Auth')
-def items(url, collection_id, limit, page, datetime, bbox, access_token=None):
-    """Return items from a given collection ID and filters."""
+@_stream_options
+def items(url, collection_id, limit, page, datetime, bbox, access_token=None, all_items=False, max_items=None,
+          fields=None):
+    """Return items from a given collection ID and filters.
+
+    With --all or --max-items, the items of all the result pages are printed as
+    they arrive, one compact JSON document per line. With --fields alone, the
+    items of the first page are printed that way.
+    """
     service = STAC(url, access_token=access_token)
     service.catalog
     filter = {
         'limit': limit,
-        'page': page
     }
 
+    if service._catalog.stac_version == '0.7.0':
+        filter['page'] = page
+
     if bbox is not None:
         filter['bbox'] = bbox
     if datetime is not None:
@@ -68,8 +120,17 @@ def items(url, collection_id, limit, page, datetime, bbox, access_token=None):
         elif service._catalog.stac_version == '0.7.0':
             filter['time'] = datetime
 
+    if all_items or max_items is not None:
+        _echo_features(service.collection(collection_id).iter_items(filter=filter, max_items=max_items, prefetch=1),
+                       fields)
+        return
+
     retval = service.collection(collection_id).get_items(filter=filter)
 
+    if fields is not None:
+        _echo_features(retval.get('features', []), fields)
+        return
+
     print(json.dumps(retval, indent=2))
 
 @click.command()
@@ -88,8 +149,15 @@ def items(url, collection_id, limit, page, datetime, bbox, access_token=None):
 @click.option('--datetime', help='Single date, date+time, or a range (\'/\' seperator), formatted to RFC 3339, section 5.6')
 @click.option('--bbox', default=None, help='Requested bounding box west, south, east, north')
 @click.option('--access-token', default=None, help='Personal Access Token of the BDC Auth')
-def search(url, collections, ids, intersects, limit, next, page, datetime, bbox, access_token=None):
-    """Search through a STAC catalog."""
+@_stream_options
+def search(url, collections, ids, intersects, limit, next, page, datetime, bbox, access_token=None,
+           all_items=False, max_items=None, fields=None):
+    """Search through a STAC catalog.
+
+    With --all or --max-items, the items of all the result pages are printed as
+    they arrive, one compact JSON document per line. With --fields alone, the
+    items of the first page are printed that way.
+    """
     service = STAC(url, access_token=access_token)
     service.catalog
 
@@ -116,11 +184,105 @@ def search(url, collections, ids, intersects, limit, next, page, datetime, bbox,
     if ids is not None:
         filter['ids'] = ids
 
+    if all_items or max_items is not None:
+        _echo_features(service.search_iter(max_items=max_items, prefetch=1, **filter), fields)
+        return
+
     retval = service.search(**filter)
 
+    if fields is not None:
+        _echo_features(retval.get('features', []), fields)
+        return
+
     print(json.dumps(retval, indent=2))
 
+def _read_features(items_file):
+    """Iterate over the features of a NDJSON file, skipping the blank lines."""
+    for line in items_file:
+        if line.strip():
+            yield json.loads(line)
+
+
+@click.command()
+@click.option('--url', default=None, help='The STAC server address (an URL).')
+@click.option('--items-file', default=None, type=click.File('r'),
+              help='A NDJSON file of items to download, one per line ("-" for the standard input), '
+                   'e.g. the output of search --all. Replaces the search filters.')
+@click.option('--collections', default=None, help='Array of Collection IDs to include in the search for items.')
+@click.option('--ids', default=None, help='Array of Item ids to download.')
+@click.option('--datetime', help='Single date, date+time, or a range (\'/\' seperator), formatted to RFC 3339, section 5.6')
+@click.option('--bbox', default=None, help='Requested bounding box west, south, east, north')
+@click.option('--limit', default=100, help='The page size of the search. Defaults to 100')
+@click.option('--max-items', default=None, type=int, help='The maximum number of items to download.')
+@click.option('--assets', default=None, help='Comma separated asset keys to download. Defaults to all the assets.')
+@click.option('--dir', 'dir', default='.', type=click.Path(file_okay=False),
+              help='The directory of the downloaded files, one sub-directory per item. '
+                   'Defaults to the current directory.')
+@click.option('--workers', default=8, help='The number of simultaneous downloads. Defaults to 8')
+@click.option('--per-host', default=4, help='The number of simultaneous downloads from a host. Defaults to 4')
+@click.option('--overwrite', is_flag=True, default=False, help='Download the files even if they already exist.')
+@click.option('--no-resume', is_flag=True, default=False, help='Discard the partial files instead of resuming them.')
+@click.option('--manifest', default=None, type=click.Path(dir_okay=False),
+              help='The NDJSON file of the results, one per asset. Defaults to manifest.jsonl in the directory.')
+@click.option('--access-token', default=None, help='Personal Access Token of the BDC Auth')
+def download(url, items_file, collections, ids, datetime, bbox, limit, max_items, assets, dir, workers, per_host,
+             overwrite, no_resume, manifest, access_token=None):
+    """Download the assets of the items found by a search or listed in a NDJSON file.
+
+    The assets of each item are saved in a sub-directory named after the item id.
+    The files already downloaded are skipped and the partial ones are resumed. The
+    result of each asset is appended to the manifest as soon as it is known, and the
+    command fails when an asset could not be downloaded.
+    """
+    if items_file is not None:
+        session = Session(pool_size=workers)
+        features = _read_features(items_file)
+        if max_items is not None:
+            features = (feature for _, feature in zip(range(max_items), features))
+    elif url is not None:
+        service = STAC(url, access_token=access_token, pool_size=workers)
+        session = service.session
+        service.catalog
+
+        filter = {'limit': limit}
+        if collections is not None:
+            filter['collections'] = collections
+        if ids is not None:
+            filter['ids'] = ids
+        if bbox is not None:
+            filter['bbox'] = bbox
+        if datetime is not None:
+            filter['time' if service._catalog.stac_version == '0.7.0' else 'datetime'] = datetime
+
+        features = service.search_iter(max_items=max_items, prefetch=1, **filter)
+    else:
+        raise click.UsageError('Either --url or --items-file is required.')
+
+    os.makedirs(dir, exist_ok=True)
+    manager = DownloadManager(session, workers=workers, per_host=per_host, resume=not no_resume, overwrite=overwrite)
+    results = manager.iter_download(features, dir=dir, assets=assets.split(',') if assets else None)
+
+    succeeded, failed = 0, 0
+    with open(manifest or os.path.join(dir, 'manifest.jsonl'), 'w') as manifest_file:
+        for result in results:
+            manifest_file.write(json.dumps({
+                'item': result.item, 'asset': result.asset, 'href': result.href, 'path': result.path,
+                'error': str(result.error) if result.error is not None else None
+            }) + '\n')
+            manifest_file.flush()
+
+            if result.error is None:
+                succeeded += 1
+            else:
+                failed += 1
+
+    click.echo(f'{succeeded} assets downloaded, {failed} failed.', err=True)
+    if failed:
+        raise click.exceptions.Exit(1)
+
+
 cli.add_command(catalog)
 cli.add_command(collection)
 cli.add_command(items)
 cli.add_command(search)
+cli.add_command(download)
@@ -6,15 +6,19 @@
 # under the terms of the MIT License; see LICENSE file for more details.
 #
 """STAC Collection module."""
-import json
 
-from pkg_resources import resource_string
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
 from .catalog import Catalog
 from .common import Provider
 from .item import Item, ItemCollection
+from .pagination import Paginator
 from .utils import Utils
 
+ItemResult = namedtuple('ItemResult', ['id', 'item', 'error'])
+"""The outcome of an Item lookup by id: ``item`` is None and ``error`` is set when it failed."""
+
 
 class Stats(dict):
     """The Stats object."""
@@ -75,42 +79,47 @@ class Extent(dict):
         :param data: Dict with Extent metadata.
         """
         super(Extent, self).__init__(data or {})
+        self._spatial = None
+        self._temporal = None
 
     @property
     def spatial(self):
         """:return: the spatial extent."""
-        if 'bbox' in self['spatial']:
-            return SpatialExtent(self['spatial'])
-        return self['spatial']
+        if self._spatial is None:
+            self._spatial = SpatialExtent(self['spatial']) if 'bbox' in self['spatial'] else self['spatial']
+        return self._spatial
 
     @property
     def temporal(self):
         """:return: the temporal extent."""
-        if 'interval' in self['temporal']:
-            return TemporalExtent(self['temporal'])
-        return self['temporal']
+        if self._temporal is None:
+            self._temporal = TemporalExtent(self['temporal']) if 'interval' in self['temporal'] else self['temporal']
+        return self._temporal
 
 
 class Collection(Catalog):
     """The STAC Collection."""
 
-    def __init__(self, data, validate=False, **request_kwargs):
+    def __init__(self, data, validate=False, session=None, cache=None, **request_kwargs):
         """Initialize instance with dictionary data.
 
         :param data: Dict with collection metadata.
         :param validate: true if the Collection should be validate using its jsonschema. Default is False.
+        :param session: (optional) The HTTP session used to request the Collection items.
+        :param cache: (optional) The :class:`stac.cache.MemoryCache` of the items requested by id.
         """
         self._validate = validate
+        self._session = session
+        self._cache = cache
         self._request_kwargs = request_kwargs
         super(Collection, self).__init__(data or {}, validate)
 
-        self._schema = json.loads(resource_string(__name__, f'jsonschemas/{self.stac_version}/collection.json'))
-
         if self._validate:
-            Utils.validate(self)
+            Utils.validate(self, 'collection')
 
         self._summaries = {k: Stats(v) for k, v in self['summaries'].items()} if self.get('summaries') else {}
         self._providers = [Provider(provider) for provider in self['providers']] if self.get('providers') else []
+        self._extent = None
 
 
     @property
@@ -135,7 +144,9 @@ class Collection(Catalog):
     @property
     def extent(self):
         """:return: the Collection extent."""
-        return Extent(self['extent'])
+        if self._extent is None:
+            self._extent = Extent(self['extent'])
+        return self._extent
 
     @property
     def properties(self):
@@ -150,9 +161,9 @@ class Collection(Catalog):
     @property
     def schema(self):
         """:return: the Collection jsonschema."""
-        return self._schema
+        return Utils.schema(self.stac_version, 'collection')
 
-    def get_items(self, item_id=None, filter=None):
+    def get_items(self, item_id=None, filter=None, lazy=False, compact=False):
         """Retrieve items of the collection.
 
         :param item_id: (optional) a str with a STAC Item id.
@@ -161,6 +172,12 @@ class Collection(Catalog):
         :param filter: (optional) A dictionary with valid STAC query parameters.
         :type filter: dict
 
+        :param lazy: true if the Items should only be built when accessed. Default is False.
+        :type lazy: bool
+
+        :param compact: true for compact Items, see :class:`stac.compact.CompactItem`. Default is False.
+        :type compact: bool
+
         :return: A GeoJSON FeatureCollection of STAC Items from the collection.
         """
         if filter is not None and 'bbox' in filter:
@@ -169,12 +186,115 @@ class Collection(Catalog):
         for link in self['links']:
             if link['rel'] == 'items':
                 if item_id is not None:
-                    data = Utils._get(f'{link["href"]}/{item_id}', **self._request_kwargs)
-                    return Item(data, self._validate)
-                data = Utils._get(f'{link["href"]}', params=filter, **self._request_kwargs)
-                return ItemCollection(data)
+                    url = f'{link["href"]}/{item_id}'
+                    item = self._cache.get(('item', url)) if self._cache is not None else None
+                    if item is None:
+                        data = Utils._get(url, session=self._session, **self._request_kwargs)
+                        item = Item(data, self._validate, self._session)
+                        if self._cache is not None:
+                            self._cache.set(('item', url), item)
+                    return item
+                data = Utils._get(f'{link["href"]}', params=filter, session=self._session, **self._request_kwargs)
+                return ItemCollection(data, session=self._session, lazy=lazy, compact=compact)
         return ItemCollection({})
 
+    def _search_items(self, search_url, ids):
+        """Search Items by id, returning them by id, or None if the search is not supported or fails."""
+        query = {'collections': self['id'], 'ids': ','.join(ids), 'limit': len(ids)}
+        try:
+            items = {item['id']: item for item in Paginator(search_url, query, self._validate, self._session,
+                                                            len(ids), **self._request_kwargs)}
+        except Exception:
+            return None
+
+        # A server ignoring the ids returns other Items.
+        if not set(items).issubset(ids):
+            return None
+        return items
+
+    def _get_item(self, item_id):
+        """Retrieve an Item by id, returning its result."""
+        try:
+            return ItemResult(item_id, self.get_items(item_id=item_id), None)
+        except Exception as e:
+            return ItemResult(item_id, None, e)
+
+    def get_items_many(self, ids, search_url=None, batch_size=100, workers=8):
+        """Retrieve many items of the collection by id.
+
+        When a STAC API search URL is given, the ids are packed into searches of ``batch_size``
+        ids. The ids of the searches not supported by the server, or failing (e.g. on a timeout or an
+        invalid response), are requested one by one, by ``workers`` concurrent requests, like
+        without a search URL.
+
+        :param ids: The STAC Item ids.
+        :type ids: Iterable[str]
+        :param search_url: (optional) The URL of the STAC API item search.
+        :type search_url: str
+        :param batch_size: The number of ids of each search. Default is 100.
+        :type batch_size: int
+        :param workers: The maximum number of simultaneous requests. Default is 8.
+        :type workers: int
+
+        :return: the result of each id, in the given order.
+        :rtype: List[ItemResult]
+        """
+        ids = list(ids)
+        unique_ids = list(dict.fromkeys(ids))
+        results = dict()
+        pending = unique_ids
+
+        items_url = next((link['href'] for link in self['links'] if link['rel'] == 'items'), None)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            if search_url is not None:
+                batches = [unique_ids[i:i + batch_size] for i in range(0, len(unique_ids), batch_size)]
+                pending = []
+                for batch, items in zip(batches, executor.map(lambda batch: self._search_items(search_url, batch),
+                                                              batches)):
+                    if items is None:
+                        pending.extend(batch)
+                        continue
+                    for item_id in batch:
+                        if item_id in items:
+                            results[item_id] = ItemResult(item_id, items[item_id], None)
+                            if self._cache is not None and items_url is not None:
+                                self._cache.set(('item', f'{items_url}/{item_id}'), items[item_id])
+                        else:
+                            results[item_id] = ItemResult(item_id, None, KeyError(
+                                f'Item {item_id} not found in collection {self["id"]}'))
+
+            for result in executor.map(self._get_item, pending):
+                results[result.id] = result
+
+        return [results[item_id] for item_id in ids]
+
+    def iter_items(self, filter=None, max_items=None, prefetch=0, compact=False):
+        """Iterate over all items of the collection, following the result pages.
+
+        The pages are requested lazily, as the items are consumed.
+
+        :param filter: (optional) A dictionary with valid STAC query parameters.
+        :type filter: dict
+        :param max_items: (optional) The maximum number of items to return.
+        :type max_items: int
+        :param prefetch: The number of pages requested ahead on a background thread. Default is 0.
+        :type prefetch: int
+        :param compact: true to iterate over compact Items, see :class:`stac.compact.CompactItem`. Default is False.
+        :type compact: bool
+
+        :return: An iterator of STAC Items from the collection.
+        :rtype: Iterator[Item]
+        """
+        if filter is not None and 'bbox' in filter:
+            filter['bbox'] = Utils.build_bbox_as_str(filter['bbox'])
+
+        for link in self['links']:
+            if link['rel'] == 'items':
+                yield from Paginator(link['href'], filter, self._validate, self._session, max_items, prefetch,
+                                     compact, self.get('stac_version'), **self._request_kwargs)
+                return
+
     def _repr_html_(self): # pragma: no cover
         """HTML repr."""
         return Utils.render_html('collection.html', collection=self)
@@ -0,0 +1,256 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Compact read-only views over the JSON documents of STAC Items.
+
+The views have the same properties as :class:`stac.Item` and the related
+objects, but they do not copy the JSON document they are built from, have no
+instance dictionary and create the nested views on access. They are read-only
+mappings instead of dicts: :meth:`CompactItem.to_item` (or ``dict(view)``)
+returns a regular object.
+"""
+
+from collections.abc import Mapping
+
+from .utils import Utils
+
+
+class _View(Mapping):
+    """A read-only mapping referencing a JSON object."""
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        """Initialize the view over a JSON object, without copying it."""
+        self._data = data if data is not None else {}
+
+    @property
+    def data(self):
+        """:return: the referenced JSON object."""
+        return self._data
+
+    def __getitem__(self, key):
+        """Return the value of a key."""
+        return self._data[key]
+
+    def __iter__(self):
+        """Iterate over the keys."""
+        return iter(self._data)
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(self._data)
+
+    def __repr__(self):
+        """Return the string representation of the view."""
+        return f'{type(self).__name__}({self._data!r})'
+
+
+class CompactLink(_View):
+    """Compact view of a Link object, see :class:`stac.Link`."""
+
+    __slots__ = ()
+
+    @property
+    def rel(self):
+        """:return: the Link relation."""
+        return self._data['rel']
+
+    @property
+    def href(self):
+        """:return: the Link url."""
+        return self._data['href']
+
+    @property
+    def type(self):
+        """:return: the type of the Link object."""
+        return self._data['type']
+
+    @property
+    def title(self):
+        """:return: the title of the Link object."""
+        return self._data['title']
+
+
+class CompactAsset(_View):
+    """Compact view of an Asset object, see :class:`stac.item.Asset`."""
+
+    __slots__ = ('_session',)
+
+    def __init__(self, data, session=None):
+        """Initialize the view over an Asset.
+
+        :param data: Dict with Asset metadata.
+        :param session: (optional) The HTTP session used to download the asset.
+        """
+        super(CompactAsset, self).__init__(data)
+        self._session = session
+
+    @property
+    def href(self):
+        """:return: the Asset href."""
+        return self._data['href']
+
+    @property
+    def title(self):
+        """:return: the Asset title."""
+        return self._data['title']
+
+    @property
+    def type(self):
+        """:return: the Asset type."""
+        return self._data['type']
+
+    def download(self, *args, **kwargs):
+        """Download the asset, see :meth:`stac.item.Asset.download`."""
+        from .item import Asset
+
+        return Asset(self._data, self._session).download(*args, **kwargs)
+
+
+class CompactGeometry(_View):
+    """Compact view of a Geometry object, see :class:`stac.Geometry`."""
+
+    __slots__ = ()
+
+    @property
+    def type(self):
+        """:return: the Geometry type."""
+        return self._data['type']
+
+    @property
+    def coordinates(self):
+        """:return: the Geometry coordinates."""
+        return self._data['coordinates']
+
+
+class CompactProperties(_View):
+    """Compact view of a Properties object, see :class:`stac.item.Properties`."""
+
+    __slots__ = ()
+
+    @property
+    def datetime(self):
+        """:return: the datetime property."""
+        return self._data['datetime']
+
+    @property
+    def license(self):
+        """:return: the license property."""
+        return self._data['license']
+
+    @property
+    def providers(self):
+        """:return: the providers property."""
+        from .common import Provider
+
+        return [Provider(p) for p in self._data['providers']] if 'providers' in self._data else []
+
+    @property
+    def title(self):
+        """:return: the title property."""
+        return self._data['title']
+
+    @property
+    def created(self):
+        """:return: the created property."""
+        return self._data['created']
+
+    @property
+    def updated(self):
+        """:return: the updated property."""
+        return self._data['updated']
+
+
+class CompactItem(_View):
+    """Compact view of the GeoJSON Feature of a STAC Item, see :class:`stac.Item`."""
+
+    __slots__ = ('_session',)
+
+    def __init__(self, data, validate=False, session=None):
+        """Initialize the view over an Item.
+
+        :param data: Dict with Item metadata.
+        :param validate: true if the Item should be validate using its jsonschema. Default is False.
+        :param session: (optional) The HTTP session used to request the Item assets.
+        """
+        super(CompactItem, self).__init__(data)
+        self._session = session
+
+        if validate:
+            Utils.validate(self, 'item')
+
+    @property
+    def stac_version(self):
+        """:return: the STAC version."""
+        return self._data.get('stac_version', '0.7.0')
+
+    @property
+    def id(self):
+        """:return: the Item identifier."""
+        return self._data['id']
+
+    @property
+    def type(self):
+        """:return: the Item type."""
+        return self._data['type']
+
+    @property
+    def bbox(self):
+        """:return: the Item Bounding Box."""
+        return self._data['bbox']
+
+    @property
+    def collection(self):
+        """:return: the Item Collection."""
+        return self._data['collection']
+
+    @property
+    def geometry(self):
+        """:return: the Item Geometry."""
+        return CompactGeometry(self._data['geometry'])
+
+    @property
+    def properties(self):
+        """:return: the Item properties."""
+        return CompactProperties(self._data['properties'])
+
+    @property
+    def links(self):
+        """:return: the Item related links."""
+        return [CompactLink(link) for link in self._data.get('links', [])]
+
+    @property
+    def assets(self):
+        """:return: the Item related assets."""
+        return {key: CompactAsset(value, self._session) for key, value in self._data.get('assets', {}).items()}
+
+    @property
+    def schema(self):
+        """:return: the Item jsonschema."""
+        return Utils.schema(self.stac_version, 'item')
+
+    def to_item(self):
+        """Return a regular Item built from the view.
+
+        :rtype: stac.Item
+        """
+        from .item import Item
+
+        return Item(self._data, session=self._session)
+
+    def download(self, *args, **kwargs):
+        """Download the Item assets, see :meth:`stac.Item.download`."""
+        return self.to_item().download(*args, **kwargs)
+
+    def read(self, *args, **kwargs):
+        """Read an asset given a band name, see :meth:`stac.Item.read`."""
+        return self.to_item().read(*args, **kwargs)
+
+    def read_bands(self, *args, **kwargs):
+        """Read the same window of several bands at once, see :meth:`stac.Item.read_bands`."""
+        return self.to_item().read_bands(*args, **kwargs)
@@ -0,0 +1,142 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Time series data cubes built from STAC Items.
+
+Notes:
+    You must install the extra `geo` containing the `rasterio` and `Shapely` library
+    in order to use this module:
+
+        pip install stac.py[geo]
+
+    The conversion to xarray also requires the extra `xarray`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .item import ItemCollection
+from .raster import bbox_window, cog_env, default_pool
+
+
+def _datetime(item):
+    """Return the sort key of an Item, its (start) datetime."""
+    properties = item.get('properties') or {}
+    return properties.get('datetime') or properties.get('start_datetime') or ''
+
+
+def _allocate(shape, dtype, out=None, path=None, fill_value=0):
+    """Return the cube array: the given one, a memory-mapped ``.npy`` file or a new array."""
+    import numpy
+
+    if out is not None:
+        if tuple(out.shape) != tuple(shape):
+            raise ValueError(f'The output array shape {out.shape} must be {shape}')
+        return out
+
+    if path is not None:
+        cube = numpy.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    else:
+        cube = numpy.empty(shape, dtype=dtype)
+
+    cube[...] = fill_value
+    return cube
+
+
+def build_cube(items, bands, bbox, crs=None, shape=None, dtype=None, out=None, path=None,
+               fill_value=0, workers=8, session=None, env=None, pool=None):
+    """Read a bbox of the given bands of each Item into a (time, band, y, x) array.
+
+    The Items are ordered by datetime. Each (Item, band) window is read by a pool of
+    threads directly into its slice of the cube, resampled (nearest neighbour) to the
+    cube shape and converted to the cube data type, so that no intermediate array is kept. With ``path``, the cube is a
+    memory-mapped ``.npy`` file and may be larger than the memory. The bands missing
+    from an Item, and the pixels of the bbox outside of a raster, are left with ``fill_value``.
+
+    :param items: The STAC Items, e.g. an :class:`stac.ItemCollection` or :meth:`stac.STAC.search_iter`.
+    :type items: Iterable[Item]
+    :param bands: The band names used in the assets.
+    :type bands: List[str]
+    :param bbox: The bounding box.
+    :type bbox: Union[str,Tuple[float],List[float],BaseGeometry]
+    :param crs: (optional) The Coordinate Reference System of the bbox. Default is EPSG:4326.
+    :type crs: str
+    :param shape: (optional) The (rows, columns) shape of the bands. Defaults to the bbox window
+        of the first band of the first Item.
+    :type shape: Tuple[int,int]
+    :param dtype: (optional) The data type of the cube. Defaults to the first band data type.
+    :param out: (optional) A preallocated (time, band, y, x) array to read into.
+    :type out: numpy.ndarray
+    :param path: (optional) The ``.npy`` file path of a memory-mapped cube.
+    :type path: str
+    :param fill_value: The value of the missing bands and pixels. Default is 0.
+    :param workers: The number of threads. Default is 8.
+    :type workers: int
+    :param session: (optional) The HTTP session used to check the URLs on failure.
+    :param env: (optional) GDAL configuration options overriding :data:`stac.raster.COG_ENV`.
+    :type env: dict
+    :param pool: (optional) The pool of open datasets. Defaults to :data:`stac.raster.default_pool`.
+    :type pool: stac.raster.DatasetPool
+
+    :return: the cube and the datetime of each time step.
+    :rtype: Tuple[numpy.ndarray,List[str]]
+    """
+    if isinstance(items, ItemCollection):
+        items = items.get('features', [])
+    items = sorted(items, key=_datetime)
+    env = env or dict()
+    pool = pool or default_pool
+    bounds = dict()
+
+    if not items:
+        raise ValueError('There is no Item to build the cube')
+
+    if shape is None or (dtype is None and out is None):
+        with cog_env(**env), pool.dataset(items[0]['assets'][bands[0]]['href'], session) as dataset:
+            window = bbox_window(dataset, bbox, crs, bounds)
+            shape = shape or (int(round(window.height)), int(round(window.width)))
+            dtype = dtype or dataset.dtypes[0]
+
+    cube = _allocate((len(items), len(bands)) + tuple(shape), dtype if out is None else out.dtype,
+                     out, path, fill_value)
+
+    def read(time, band, href):
+        with cog_env(**env), pool.dataset(href, session) as dataset:
+            dataset.read(1, window=bbox_window(dataset, bbox, crs, bounds), out=cube[time, band],
+                         out_dtype=cube.dtype, boundless=True, fill_value=fill_value)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read, time, band, item['assets'][name]['href'])
+                   for time, item in enumerate(items)
+                   for band, name in enumerate(bands)
+                   if name in (item.get('assets') or {})]
+        for future in futures:
+            future.result()
+
+    if path is not None:
+        cube.flush()
+
+    return cube, [_datetime(item) for item in items]
+
+
+def to_xarray(cube, times, bands):
+    """Wrap a cube built by :func:`build_cube` into a labelled xarray DataArray.
+
+    :param cube: The (time, band, y, x) array.
+    :type cube: numpy.ndarray
+    :param times: The datetime of each time step.
+    :type times: List[str]
+    :param bands: The band names.
+    :type bands: List[str]
+
+    :rtype: xarray.DataArray
+    """
+    import numpy
+    import xarray
+
+    times = numpy.array([time.rstrip('Z') for time in times], dtype='datetime64[ns]')
+
+    return xarray.DataArray(cube, dims=('time', 'band', 'y', 'x'), coords={'time': times, 'band': list(bands)})
@@ -0,0 +1,484 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Download of STAC Item assets."""
+
+import glob
+import hashlib
+import os
+import shutil
+import threading
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+import requests
+
+from .utils import Utils
+
+CHUNK_SIZE = 1024 * 1024
+"""The default size in bytes of the chunks written while downloading."""
+
+DownloadResult = namedtuple('DownloadResult', ['item', 'asset', 'href', 'path', 'error'])
+"""The outcome of an asset download: ``path`` is None and ``error`` is set when it failed."""
+
+
+class Progress:
+    """A thread-safe progress bar over the downloaded bytes.
+
+    If tqdm is installed a progressbar will be shown, otherwise the progress is only counted.
+    """
+
+    def __init__(self, desc=None, enabled=True):
+        """Create the progress bar.
+
+        :param desc: (optional) The progress bar description.
+        :type desc: str
+        :param enabled: False to hide the progress bar. Default is True.
+        :type enabled: bool
+        """
+        self._lock = threading.Lock()
+        self._bar = None
+        self.total = 0
+        self.count = 0
+
+        if enabled:
+            try:
+                from tqdm import tqdm
+
+                self._bar = tqdm(desc=desc, total=0, unit='B', unit_scale=True, unit_divisor=1024, miniters=1)
+            except ImportError:
+                pass
+
+    def add_total(self, size):
+        """Increase the expected number of bytes."""
+        with self._lock:
+            self.total += size
+            if self._bar is not None:
+                self._bar.total = self.total
+                self._bar.refresh()
+
+    def update(self, size):
+        """Increase the number of downloaded bytes."""
+        with self._lock:
+            self.count += size
+            if self._bar is not None:
+                self._bar.update(size)
+
+    def close(self):
+        """Close the progress bar."""
+        if self._bar is not None:
+            self._bar.close()
+
+    def __enter__(self):
+        """Enter the runtime context of the progress bar."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the progress bar when leaving the runtime context."""
+        self.close()
+
+
+def asset_filename(href, dir=None):
+    """Return the local file path of an asset, creating its directory if needed.
+
+    :param href: The asset href.
+    :type href: str
+    :param dir: (optional) The directory of the file. Defaults to the current working directory.
+    :type dir: str
+
+    :rtype: str
+    """
+    filename = urlparse(href)[2].split('/')[-1]
+
+    if dir:
+        filename = os.path.join(dir, filename)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+    return filename
+
+
+def _remote_info(href, session=None):
+    """Return the size, the validator (ETag or Last-Modified) and the range support of an URL.
+
+    The values are None (or False) when the server does not answer to HEAD requests.
+    """
+    try:
+        response = Utils.safe_request(href, method='head', session=session, allow_redirects=True)
+    except (requests.exceptions.RequestException, ConnectionError):
+        return None, None, False
+
+    size = response.headers.get('content-length')
+    validator = response.headers.get('etag') or response.headers.get('last-modified')
+
+    return (int(size) if size is not None else None), validator, response.headers.get('accept-ranges') == 'bytes'
+
+
+def _part_filename(filename, validator):
+    """Return the file path of the partial download, bound to the remote file version."""
+    if validator is None:
+        return f'{filename}.part'
+    return f'{filename}.{hashlib.sha1(validator.encode()).hexdigest()[:10]}.part'
+
+
+def _validator_filename(filename):
+    """Return the path of the hidden file keeping the validator of a downloaded file."""
+    directory, name = os.path.split(filename)
+    return os.path.join(directory, f'.{name}.validator')
+
+
+def _stored_validator(filename):
+    """Return the validator of the remote file a downloaded file was fetched from, or None if unknown."""
+    try:
+        with open(_validator_filename(filename)) as validator_file:
+            return validator_file.read()
+    except OSError:
+        return None
+
+
+def _store_validator(filename, validator):
+    """Keep the validator of the remote file a downloaded file was fetched from."""
+    path = _validator_filename(filename)
+    if validator is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    with open(path, 'w') as validator_file:
+        validator_file.write(validator)
+
+
+def _fetch(href, filename, session, chunk_size, progress, validator=None, start=0, end=None, count_total=False):
+    """Download the bytes [start, end] of an URL into a file, resuming from its current size.
+
+    With ``count_total``, the size announced by the response is added to the progress total.
+
+    :raise ValueError: When a byte range was required but the server sent the whole file.
+    """
+    offset = os.path.getsize(filename) if os.path.exists(filename) else 0
+
+    if end is not None and start + offset > end:
+        if progress is not None:
+            progress.update(offset)
+        return
+
+    headers = dict()
+    if start + offset > 0 or end is not None:
+        headers['Range'] = f'bytes={start + offset}-{"" if end is None else end}'
+        if validator is not None:
+            headers['If-Range'] = validator
+
+    response = Utils.safe_request(href, session=session, stream=True, headers=headers)
+
+    with response:
+        if 'Range' in headers and response.status_code != 206:
+            if start > 0 or end is not None:
+                raise ValueError(f'The server does not support byte ranges for {href}')
+            # The remote file changed or can not be resumed: start over.
+            offset = 0
+
+        if progress is not None and count_total:
+            progress.add_total(offset + int(response.headers.get('content-length', 0)))
+
+        if progress is not None and offset:
+            progress.update(offset)
+
+        with open(filename, 'ab' if offset else 'wb') as fout:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                fout.write(chunk)
+                if progress is not None:
+                    progress.update(len(chunk))
+
+
+def download_file(href, filename, session=None, chunk_size=CHUNK_SIZE, progress=None,
+                  resume=True, segments=1, overwrite=False):
+    """Download the content of an URL into a file.
+
+    The content is first written to a ``.part`` file, named after the remote ETag (or
+    Last-Modified date), which is moved to ``filename`` once complete. An interrupted
+    download is resumed from the partial file using an HTTP Range request, guarded by
+    ``If-Range`` so that a file changed on the server is downloaded again from the start.
+    A file already on disk with the remote size is not downloaded again, unless the
+    ETag (or Last-Modified date) kept next to it, in a hidden ``.<name>.validator``
+    file, shows that the remote file changed.
+
+    With ``segments`` greater than one, servers supporting byte ranges are requested for
+    that many ranges of the file at once, each one resumable on its own.
+
+    :param href: The URL to download.
+    :type href: str
+    :param filename: The destination file path.
+    :type filename: str
+    :param session: (optional) The HTTP session used to send the request.
+    :type session: requests.Session
+    :param chunk_size: The size in bytes of the chunks written to the file.
+    :type chunk_size: int
+    :param progress: (optional) The :class:`Progress` updated while downloading.
+    :param resume: False to discard any partial download. Default is True.
+    :type resume: bool
+    :param segments: The number of byte ranges downloaded at once. Default is 1.
+    :type segments: int
+    :param overwrite: True to download the file even if it is already on disk. Default is False.
+    :type overwrite: bool
+
+    :return: path to downloaded file.
+    """
+    size, validator, ranges = None, None, False
+    if resume or segments > 1 or not overwrite:
+        size, validator, ranges = _remote_info(href, session)
+
+    if progress is not None and size is not None:
+        progress.add_total(size)
+
+    if not overwrite and size is not None and os.path.isfile(filename) and os.path.getsize(filename) == size \
+            and (validator is None or _stored_validator(filename) in (None, validator)):
+        if progress is not None:
+            progress.update(size)
+        return filename
+
+    part = _part_filename(filename, validator)
+
+    if segments > 1 and ranges and size is not None and size > chunk_size:
+        step = -(-size // segments)
+        bounds = [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+        segment_files = [f'{part}.{start}-{end}' for start, end in bounds]
+
+        # Segments of a previous run with other bounds can not be resumed.
+        for segment_file in glob.glob(glob.escape(part) + '.*'):
+            if not resume or segment_file not in segment_files:
+                os.remove(segment_file)
+
+        with ThreadPoolExecutor(max_workers=len(bounds)) as executor:
+            futures = [executor.submit(_fetch, href, segment_file, session, chunk_size, progress, validator, start, end)
+                       for segment_file, (start, end) in zip(segment_files, bounds)]
+            for future in futures:
+                future.result()
+
+        with open(part, 'wb') as fout:
+            for segment_file in segment_files:
+                with open(segment_file, 'rb') as fin:
+                    shutil.copyfileobj(fin, fout, chunk_size)
+                os.remove(segment_file)
+    else:
+        if (not resume or not ranges) and os.path.exists(part):
+            os.remove(part)
+
+        if size is not None and os.path.exists(part) and os.path.getsize(part) == size:
+            if progress is not None:
+                progress.update(size)
+        else:
+            _fetch(href, part, session, chunk_size, progress, validator if ranges else None,
+                   count_total=size is None)
+
+    os.replace(part, filename)
+    _store_validator(filename, validator)
+
+    return filename
+
+
+class DownloadSummary:
+    """The results of a :class:`DownloadManager` run."""
+
+    def __init__(self, results):
+        """Initialize the summary with the list of :data:`DownloadResult`."""
+        self._results = results
+
+    @property
+    def results(self):
+        """:return: the results of every asset, in submission order."""
+        return self._results
+
+    @property
+    def succeeded(self):
+        """:return: the results of the downloaded assets."""
+        return [result for result in self._results if result.error is None]
+
+    @property
+    def failed(self):
+        """:return: the results of the assets which could not be downloaded."""
+        return [result for result in self._results if result.error is not None]
+
+    def __len__(self):
+        """Return the number of assets."""
+        return len(self._results)
+
+    def __iter__(self):
+        """Iterate over the results."""
+        return iter(self._results)
+
+    def __repr__(self):
+        """Return the string representation of a DownloadSummary object."""
+        return f'<DownloadSummary [{len(self.succeeded)} succeeded, {len(self.failed)} failed]>'
+
+
+class DownloadManager:
+    """Download the assets of many Items at once.
+
+    The assets of each Item are saved in a sub-directory named after its id, since
+    many catalogs use the same file names in every Item. They are fetched by a bounded
+    pool of threads sharing one HTTP session, with an additional limit of
+    simultaneous downloads per host. The downloads are
+    queued per host and only handed to a thread when their host has a free slot, so
+    that no thread waits on a busy host while the assets of another one are pending.
+    For connection reuse, the session pool size should be at least the number of workers.
+    """
+
+    def __init__(self, session=None, workers=8, per_host=4, progress=True, chunk_size=CHUNK_SIZE,
+                 resume=True, segments=1, overwrite=False, queue_size=None, item_dirs=True):
+        """Create a download manager.
+
+        :param session: (optional) The HTTP session used to send the requests.
+        :type session: requests.Session
+        :param workers: The maximum number of simultaneous downloads. Default is 8.
+        :type workers: int
+        :param per_host: The maximum number of simultaneous downloads from a host. Default is 4.
+        :type per_host: int
+        :param progress: False to hide the aggregate progress bar. Default is True.
+        :type progress: bool
+        :param chunk_size: The size in bytes of the chunks written to the files.
+        :type chunk_size: int
+        :param resume: False to discard any partial download. Default is True.
+        :type resume: bool
+        :param segments: The number of byte ranges of a file downloaded at once. Default is 1.
+        :type segments: int
+        :param overwrite: True to download the files even if they are already on disk. Default is False.
+        :type overwrite: bool
+        :param queue_size: (optional) The maximum number of assets read ahead of the downloads.
+            Defaults to 4 times the number of workers.
+        :type queue_size: int
+        :param item_dirs: True to save the assets of each Item in a sub-directory named after the
+            Item id, False to save all the files in the same directory. Default is True.
+        :type item_dirs: bool
+        """
+        self._session = session
+        self._workers = workers
+        self._per_host = per_host
+        self._progress = progress
+        self._chunk_size = chunk_size
+        self._resume = resume
+        self._segments = segments
+        self._overwrite = overwrite
+        self._queue_size = queue_size or 4 * workers
+        self._item_dirs = item_dirs
+
+    def _filename(self, item_id, href, dir):
+        """Return the local file path of an asset of an Item."""
+        if self._item_dirs and item_id is not None:
+            dir = os.path.join(dir or '', str(item_id).replace('/', '_').replace(os.sep, '_'))
+        return asset_filename(href, dir)
+
+    def _download(self, item_id, asset_key, asset, filename, progress):
+        """Download a single asset, returning its result."""
+        href = asset['href']
+        try:
+            path = download_file(href, filename, session=self._session,
+                                 chunk_size=self._chunk_size, progress=progress, resume=self._resume,
+                                 segments=self._segments, overwrite=self._overwrite)
+            return DownloadResult(item_id, asset_key, href, path, None)
+        except Exception as e:
+            return DownloadResult(item_id, asset_key, href, None, e)
+
+    @staticmethod
+    def _items(items):
+        """Return an iterable of Items from an Item, an ItemCollection or an iterable of Items."""
+        if isinstance(items, dict):
+            return [items] if 'assets' in items else items.get('features', [])
+        return items
+
+    def _run(self, tasks, progress):
+        """Download the (item id, asset key, asset, filename) tasks, yielding (index, result) as they complete.
+
+        At most ``queue_size`` tasks are read ahead of the downloads. A task writing to
+        the file of a previous one fails instead of overwriting it.
+        """
+        tasks = enumerate(tasks)
+        pending = OrderedDict()
+        queued = 0
+        running = dict()
+        active = Counter()
+        filenames = set()
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            while True:
+                for index, task in tasks:
+                    item_id, asset_key, asset, filename = task
+                    if filename in filenames:
+                        yield index, DownloadResult(item_id, asset_key, asset['href'], None, FileExistsError(
+                            f'The file {filename} is the destination of another asset'))
+                        continue
+                    filenames.add(filename)
+
+                    pending.setdefault(urlparse(task[2]['href']).netloc, deque()).append((index, task))
+                    queued += 1
+                    if queued >= self._queue_size:
+                        break
+
+                for host in list(pending):
+                    host_tasks = pending[host]
+                    while host_tasks and active[host] < self._per_host and len(running) < self._workers:
+                        index, task = host_tasks.popleft()
+                        running[executor.submit(self._download, *task, progress)] = (host, index)
+                        active[host] += 1
+                        queued -= 1
+                    if not host_tasks:
+                        del pending[host]
+
+                if not running:
+                    return
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    host, index = running.pop(future)
+                    active[host] -= 1
+                    yield index, future.result()
+
+    def iter_download(self, items, dir=None, assets=None):
+        """Download the assets of the given Items, yielding each result as soon as it is known.
+
+        The Items are consumed as the downloads progress, so an iterator of Items such as
+        :meth:`stac.STAC.search_iter` is never held in memory at once.
+
+        :param items: An Item, an ItemCollection or an iterable of Items.
+        :param dir: Directory path to download the assets, if left None,
+                    the assets will be downloaded to the current
+                    working directory.
+        :param assets: (optional) The asset keys to download. Defaults to all the assets.
+        :type assets: Iterable[str]
+
+        :return: the result of each asset, in completion order.
+        :rtype: Iterator[DownloadResult]
+        """
+        for _, result in self._iter_results(items, dir, assets):
+            yield result
+
+    def _iter_results(self, items, dir, assets):
+        """Yield the (index, result) of each asset of the Items, in completion order."""
+        assets = set(assets) if assets is not None else None
+
+        tasks = ((item.get('id'), key, asset, self._filename(item.get('id'), asset['href'], dir))
+                 for item in self._items(items)
+                 for key, asset in (item.get('assets') or {}).items()
+                 if assets is None or key in assets)
+
+        with Progress(desc='Downloading', enabled=self._progress) as progress:
+            yield from self._run(tasks, progress)
+
+    def download(self, items, dir=None, assets=None):
+        """Download the assets of the given Items.
+
+        :param items: An Item, an ItemCollection or an iterable of Items.
+        :param dir: Directory path to download the assets, if left None,
+                    the assets will be downloaded to the current
+                    working directory.
+        :param assets: (optional) The asset keys to download. Defaults to all the assets.
+        :type assets: Iterable[str]
+
+        :return: the summary of downloaded and failed assets.
+        :rtype: DownloadSummary
+        """
+        results = dict(self._iter_results(items, dir, assets))
+
+        return DownloadSummary([results[index] for index in range(len(results))])
@@ -0,0 +1,305 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Columnar export of STAC Items to Arrow, pandas and GeoParquet.
+
+Notes:
+    You must install the extra `arrow` containing the `pyarrow` library
+    in order to use this module:
+
+        pip install stac.py[arrow]
+
+    The conversion to pandas also requires the `pandas` library.
+"""
+
+import json
+import os
+import tempfile
+from itertools import islice
+
+from .item import ItemCollection
+
+BBOX_COLUMNS = ('bbox_xmin', 'bbox_ymin', 'bbox_xmax', 'bbox_ymax')
+
+DATETIME_PROPERTIES = ('datetime', 'start_datetime', 'end_datetime', 'created', 'updated')
+
+PROPERTY_TYPES = {
+    'title': 'string',
+    'description': 'string',
+    'license': 'string',
+    'platform': 'string',
+    'constellation': 'string',
+    'mission': 'string',
+    'gsd': 'float64',
+    'eo:gsd': 'float64',
+    'eo:cloud_cover': 'float64',
+    'view:off_nadir': 'float64',
+    'view:incidence_angle': 'float64',
+    'view:azimuth': 'float64',
+    'view:sun_azimuth': 'float64',
+    'view:sun_elevation': 'float64',
+    'proj:epsg': 'int64',
+}
+"""The Arrow types of the well-known properties, whatever the values of a page."""
+
+
+def _column(values):
+    """Build an Arrow array, falling back to JSON strings for values of mixed types."""
+    import pyarrow as pa
+
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([json.dumps(value) if value is not None else None for value in values], pa.string())
+
+
+def _timestamp(values):
+    """Build an Arrow array of UTC timestamps from RFC 3339 strings, keeping strings when unparsable."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    column = _column(values)
+    if pa.types.is_null(column.type):
+        return pa.nulls(len(column), pa.timestamp('us', tz='UTC'))
+    if not pa.types.is_string(column.type):
+        return column
+    try:
+        return pc.cast(column, pa.timestamp('us', tz='UTC'))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return column
+
+
+def _property(key, values):
+    """Build the Arrow array of a property, with a type which does not depend on the page values.
+
+    The well-known properties have the types of :data:`PROPERTY_TYPES`, the datetime ones are
+    timestamps and the integers are promoted to float64. The columns without any value are null-typed.
+    """
+    import pyarrow as pa
+
+    if key in DATETIME_PROPERTIES:
+        return _timestamp(values)
+
+    if key in PROPERTY_TYPES:
+        try:
+            return pa.array(values, getattr(pa, PROPERTY_TYPES[key])())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+
+    column = _column(values)
+    if pa.types.is_integer(column.type):
+        return column.cast(pa.float64())
+    return column
+
+
+def _wkb(geometry):
+    """Encode a GeoJSON geometry as WKB."""
+    from shapely.geometry import shape
+
+    return shape(geometry).wkb if geometry else None
+
+
+def _bounds(bbox):
+    """Return the 2D bounds (xmin, ymin, xmax, ymax) of a 2D or 3D bbox."""
+    if not bbox:
+        return (None,) * 4
+    if len(bbox) == 6:
+        return bbox[0], bbox[1], bbox[3], bbox[4]
+    return tuple(bbox)
+
+
+def to_arrow(features):
+    """Convert STAC Items to an Arrow table, one row per Item.
+
+    The table has the columns ``id``, ``collection``, ``geometry`` (WKB), the four
+    ``bbox_*`` bounds, one column per key of the Item ``properties`` and one
+    ``assets.<key>.href`` column per asset key. The well-known datetime properties
+    are converted to UTC timestamps, the other well-known properties have the types of
+    :data:`PROPERTY_TYPES` and the integer properties are promoted to float64, so that
+    the pages of a search have the same columns types. Each column is built in a single pass.
+
+    :param features: The STAC Items or GeoJSON Features, e.g. an :class:`stac.ItemCollection`.
+    :type features: Iterable[dict]
+
+    :rtype: pyarrow.Table
+    """
+    import pyarrow as pa
+
+    if isinstance(features, ItemCollection):
+        features = features.get('features', [])
+    features = list(features)
+
+    properties = [feature.get('properties') or {} for feature in features]
+    assets = [feature.get('assets') or {} for feature in features]
+    bboxes = [_bounds(feature.get('bbox')) for feature in features]
+
+    columns = {
+        'id': pa.array([feature.get('id') for feature in features], pa.string()),
+        'collection': pa.array([feature.get('collection') for feature in features], pa.string()),
+        'geometry': pa.array([_wkb(feature.get('geometry')) for feature in features], pa.binary()),
+    }
+
+    for position, name in enumerate(BBOX_COLUMNS):
+        columns[name] = pa.array([bbox[position] for bbox in bboxes], pa.float64())
+
+    property_keys = dict.fromkeys(key for props in properties for key in props)
+    for key in property_keys:
+        if key in columns:
+            continue
+        values = [props.get(key) for props in properties]
+        columns[key] = _property(key, values)
+
+    asset_keys = dict.fromkeys(key for item_assets in assets for key in item_assets)
+    for key in asset_keys:
+        columns[f'assets.{key}.href'] = pa.array([item_assets[key].get('href') if key in item_assets else None
+                                                  for item_assets in assets], pa.string())
+
+    return pa.table(columns)
+
+
+def to_pandas(features):
+    """Convert STAC Items to a pandas DataFrame, one row per Item.
+
+    See :func:`to_arrow` for the columns.
+
+    :param features: The STAC Items or GeoJSON Features, e.g. an :class:`stac.ItemCollection`.
+    :type features: Iterable[dict]
+
+    :rtype: pandas.DataFrame
+    """
+    return to_arrow(features).to_pandas()
+
+
+def _batches(source, batch_size):
+    """Group a source of pages or Items into lists of features."""
+    if isinstance(source, ItemCollection):
+        yield source.get('features', [])
+        return
+
+    iterator = iter(source)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+
+        if isinstance(batch[0], ItemCollection):
+            for page in batch:
+                yield page.get('features', [])
+        else:
+            yield batch
+
+
+def _merge_type(current, other):
+    """Return the type of a column holding values of both types: the non-null one, else strings."""
+    import pyarrow as pa
+
+    if current is None or current == other or pa.types.is_null(current):
+        return other
+    if pa.types.is_null(other):
+        return current
+    if pa.types.is_floating(current) and pa.types.is_integer(other):
+        return current
+    if pa.types.is_integer(current) and pa.types.is_floating(other):
+        return other
+    return pa.string()
+
+
+def _conform(column, type):
+    """Cast a column to the given type, encoding the values as JSON strings when Arrow can not cast them."""
+    import pyarrow as pa
+
+    if column.type == type:
+        return column
+    if pa.types.is_null(column.type):
+        return pa.nulls(len(column), type)
+    try:
+        return column.cast(type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        if not pa.types.is_string(type):
+            raise
+        return pa.array([json.dumps(value) if value is not None else None for value in column.to_pylist()], type)
+
+
+def _align(table, schema):
+    """Cast a table to the given schema, filling the missing columns with nulls."""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(_conform(table.column(field.name), field.type))
+        else:
+            columns.append(pa.nulls(len(table), field.type))
+
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_geoparquet(source, path, batch_size=1000, **writer_kwargs):
+    """Stream STAC Items into a GeoParquet file, one page (or batch) at a time.
+
+    Only one page is converted and held in memory at a time. The pages are first
+    spilled to temporary files next to ``path`` while the file schema is collected:
+    it has every column found in any page, with the property types described in
+    :func:`_property`. A column whose type still differs between pages (e.g. numbers
+    and strings) is written as strings, and the null-typed columns take the type of
+    the values found in the other pages, or string. The pages are then written to
+    the file with this schema, the missing columns as nulls.
+
+    :param source: An :class:`stac.ItemCollection`, an iterable of ItemCollection pages, or an
+        iterable of Items such as the ones returned by :meth:`stac.STAC.search_iter`.
+    :param path: The GeoParquet file path.
+    :type path: str
+    :param batch_size: The number of Items written at once when the source yields Items. Default is 1000.
+    :type batch_size: int
+    :param writer_kwargs: (optional) Any argument supported by ``pyarrow.parquet.ParquetWriter``.
+
+    :return: the number of Items written.
+    :rtype: int
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    geo = {
+        'version': '1.0.0',
+        'primary_column': 'geometry',
+        'columns': {
+            'geometry': {'encoding': 'WKB', 'geometry_types': []}
+        }
+    }
+
+    with tempfile.TemporaryDirectory(prefix='.stac-', dir=os.path.dirname(os.path.abspath(path))) as spill:
+        pages = []
+        types = dict()
+        for features in _batches(source, batch_size):
+            if not features:
+                continue
+
+            table = to_arrow(features)
+            for field in table.schema:
+                types[field.name] = _merge_type(types.get(field.name), field.type)
+
+            pages.append(os.path.join(spill, f'{len(pages)}.parquet'))
+            pq.write_table(table, pages[-1])
+
+        if not pages:
+            return 0
+
+        schema = pa.schema([(name, pa.string() if pa.types.is_null(type) else type)
+                            for name, type in types.items()], metadata={b'geo': json.dumps(geo).encode()})
+
+        count = 0
+        writer = pq.ParquetWriter(path, schema, **writer_kwargs)
+        try:
+            for page in pages:
+                table = pq.read_table(page)
+                writer.write_table(_align(table, schema))
+                count += len(table)
+                os.remove(page)
+        finally:
+            writer.close()
+
+    return count
@@ -0,0 +1,249 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Concurrent searches over several STAC queries or endpoints."""
+
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from .stac import STAC
+from .utils import Utils
+
+
+def merge_searches(searches, timeout=None, errors=None, max_items=None, buffer_size=1000, workers=8):
+    """Run several Item searches at once and merge their results as they arrive.
+
+    Up to ``workers`` searches run at a time, each on its own thread; the next search
+    starts when one finishes, fails or is abandoned. The Items are yielded in arrival
+    order, and the duplicates (same ``collection`` and ``id``) are removed.
+
+    :param searches: A dict mapping a search name to a callable returning an iterable of Items.
+    :type searches: Dict[str, Callable[[], Iterable[Item]]]
+    :param timeout: (optional) The maximum number of seconds to wait for the next Item of a running search.
+        A search which does not produce an Item in time is abandoned. Default is no timeout.
+    :type timeout: float
+    :param errors: (optional) A dict filled with the exception of each failed or abandoned search.
+    :type errors: dict
+    :param max_items: (optional) The maximum number of Items to return.
+    :type max_items: int
+    :param buffer_size: The maximum number of Items waiting to be consumed. Default is 1000.
+    :type buffer_size: int
+    :param workers: The maximum number of searches running at a time, None for all at once. Default is 8.
+    :type workers: int
+
+    :returns: An iterator of STAC Items.
+    :rtype: Iterator[Item]
+    """
+    errors = errors if errors is not None else dict()
+    results = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+
+    def put(entry):
+        while not stop.is_set():
+            try:
+                results.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(name, search):
+        try:
+            for item in search():
+                if not put(('item', name, item)):
+                    return
+            put(('done', name, None))
+        except Exception as e:
+            put(('error', name, e))
+
+    pending = iter(searches.items())
+    last_activity = dict()
+
+    def start_next():
+        for name, search in pending:
+            last_activity[name] = time.monotonic()
+            threading.Thread(target=produce, args=(name, search), name=f'stac-search-{name}', daemon=True).start()
+            return
+
+    for _ in range(workers or len(searches)):
+        start_next()
+
+    seen = set()
+    try:
+        while last_activity:
+            wait = None
+            if timeout is not None:
+                wait = max(min(last_activity.values()) + timeout - time.monotonic(), 0)
+
+            try:
+                kind, name, payload = results.get(timeout=wait)
+            except queue.Empty:
+                now = time.monotonic()
+                for name in [name for name, last in last_activity.items() if last + timeout <= now]:
+                    errors[name] = TimeoutError(f'The search {name} did not respond in {timeout} seconds')
+                    del last_activity[name]
+                    start_next()
+                continue
+
+            if name not in last_activity:
+                continue
+            last_activity[name] = time.monotonic()
+
+            if kind == 'item':
+                key = (payload.get('collection'), payload.get('id'))
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                yield payload
+
+                if max_items is not None and len(seen) >= max_items:
+                    return
+            else:
+                if kind == 'error':
+                    errors[name] = payload
+                del last_activity[name]
+                start_next()
+    finally:
+        stop.set()
+
+
+def _parse_datetime(value):
+    """Parse a RFC 3339 date or date-time string, assuming UTC when no offset is given."""
+    moment = datetime.fromisoformat(value.strip().replace('Z', '+00:00').replace('z', '+00:00'))
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def split_bbox(bbox, tiles):
+    """Split a bounding box into a grid of tiles.
+
+    The adjacent tiles share their edges, so the Items on an edge are found in both.
+
+    :param bbox: The bounding box, see :meth:`stac.utils.Utils.build_bbox`.
+    :type bbox: Union[str,List[float],Tuple[float]]
+    :param tiles: The number of tiles along each axis, as an int or a (columns, rows) tuple.
+    :type tiles: Union[int,Tuple[int,int]]
+
+    :returns: The tiles bounding boxes, as strings.
+    :rtype: List[str]
+    """
+    columns, rows = (tiles, tiles) if isinstance(tiles, int) else tiles
+    xmin, ymin, xmax, ymax = Utils.build_bbox(bbox).bounds
+    width, height = (xmax - xmin) / columns, (ymax - ymin) / rows
+
+    return [Utils.build_bbox_as_str((xmin + column * width, ymin + row * height,
+                                     xmax if column == columns - 1 else xmin + (column + 1) * width,
+                                     ymax if row == rows - 1 else ymin + (row + 1) * height))
+            for row in range(rows) for column in range(columns)]
+
+
+def split_datetime(interval, periods):
+    """Split a closed datetime interval ``start/end`` into consecutive periods of the same length.
+
+    The outer bounds are kept as given and the adjacent periods share their bounds, so
+    the Items on a bound are found in both. Open intervals and single datetimes are not split.
+
+    :param interval: The datetime interval, formatted to RFC 3339, section 5.6.
+    :type interval: str
+    :param periods: The number of periods.
+    :type periods: int
+
+    :returns: The periods datetime intervals.
+    :rtype: List[str]
+    """
+    start, _, end = interval.partition('/')
+    if not end or '..' in (start, end) or not start or periods < 2:
+        return [interval]
+
+    begin, finish = _parse_datetime(start), _parse_datetime(end)
+    step = (finish - begin) / periods
+    bounds = [start] + [(begin + step * index).isoformat().replace('+00:00', 'Z')
+                        for index in range(1, periods)] + [end]
+
+    return [f'{bounds[index]}/{bounds[index + 1]}' for index in range(periods)]
+
+
+def split_query(query, tiles=None, periods=None):
+    """Split a search query into smaller queries by space and/or time.
+
+    The results of the queries cover the results of the original one, with duplicates
+    for the Items on the tiles edges or periods bounds.
+
+    :param query: The STAC query parameters.
+    :type query: dict
+    :param tiles: (optional) The number of tiles of the ``bbox`` along each axis, as an int or a (columns, rows) tuple.
+    :type tiles: Union[int,Tuple[int,int]]
+    :param periods: (optional) The number of periods of the ``datetime`` (or ``time``) interval.
+    :type periods: int
+
+    :rtype: List[dict]
+    """
+    queries = [dict(query)]
+
+    if tiles is not None and query.get('bbox') is not None:
+        queries = [dict(sub, bbox=bbox) for sub in queries for bbox in split_bbox(query['bbox'], tiles)]
+
+    key = 'datetime' if 'datetime' in query else 'time'
+    if periods is not None and query.get(key) is not None:
+        queries = [dict(sub, **{key: interval}) for sub in queries
+                   for interval in split_datetime(query[key], periods)]
+
+    return queries
+
+
+class FederatedSTAC:
+    """Search several STAC endpoints at once, e.g. a STAC server and its mirrors.
+
+    The query is sent to every endpoint concurrently, their result streams are
+    merged and the Items found in more than one endpoint are returned once.
+    """
+
+    def __init__(self, endpoints, timeout=None, **client_kwargs):
+        """Create a federated client.
+
+        :param endpoints: The STAC clients, or the URLs of the Root STAC Catalogs.
+        :type endpoints: Iterable[Union[STAC,str]]
+        :param timeout: (optional) The maximum number of seconds to wait for the next Item of an endpoint.
+            A slower endpoint is abandoned and reported in :attr:`errors`. Default is no timeout.
+        :type timeout: float
+        :param client_kwargs: (optional) Arguments given to :class:`stac.STAC` for the endpoints given by URL.
+        """
+        self._clients = [endpoint if isinstance(endpoint, STAC) else STAC(endpoint, **client_kwargs)
+                         for endpoint in endpoints]
+        self._timeout = timeout
+        self._errors = dict()
+
+    @property
+    def clients(self):
+        """:return: the STAC clients of the endpoints."""
+        return self._clients
+
+    @property
+    def errors(self):
+        """:return: the exception of each endpoint which failed or timed out in the last search, by URL."""
+        return self._errors
+
+    def search(self, max_items=None, **query):
+        """Iterate over the Items matching a filter in all endpoints, following the result pages.
+
+        :param max_items: (optional) The maximum number of Items to return.
+        :type max_items: int
+        :param query: (optional) A dictionary with valid STAC query parameters from query kwarg.
+        :type query: dict
+
+        :returns: An iterator of STAC Items, without duplicates.
+        :rtype: Iterator[Item]
+        """
+        self._errors = dict()
+
+        searches = {client.url: (lambda client=client: client.search_iter(**dict(query)))
+                    for client in self._clients}
+
+        return merge_searches(searches, timeout=self._timeout, errors=self._errors, max_items=max_items,
+                              workers=len(searches))
@@ -7,25 +7,24 @@
 #
 """STAC Item module."""
 
-import json
-import os
-import shutil
-from urllib.parse import urlparse
-
-from pkg_resources import resource_string
+from collections.abc import Sequence
 
 from .common import Link, Provider
+from .download import (CHUNK_SIZE, DownloadManager, Progress, asset_filename,
+                       download_file)
 from .utils import Utils
 
 
 class Asset(dict):
     """Asset object."""
 
-    def __init__(self, data):
+    def __init__(self, data, session=None):
         """Initialize instance with dictionary data.
 
         :param data: Dict with Asset metadata.
+        :param session: (optional) The HTTP session used to download the asset.
         """
+        self._session = session
         super(Asset, self).__init__(data or {})
 
     @property
@@ -43,38 +42,30 @@ class Asset(dict):
         """:return: the Asset type."""
         return self['type']
 
-    def download(self, dir=None): # pragma: no cover
+    def download(self, dir=None, chunk_size=CHUNK_SIZE, resume=True, segments=1, overwrite=False):
         """Download the asset to an indicated folder.
 
-        If tqdm is installed a progressbar will be shown.
+        If tqdm is installed a progressbar will be shown. See :func:`stac.download.download_file`
+        for the resume and segmented download options.
 
         :param dir: Directory path to download the asset, if left None,
                     the asset will be downloaded to the current
                     working directory.
+        :param chunk_size: The size in bytes of the chunks written to the file. Default is 1 MiB.
+        :type chunk_size: int
+        :param resume: False to discard any partial download. Default is True.
+        :type resume: bool
+        :param segments: The number of byte ranges downloaded at once. Default is 1.
+        :type segments: int
+        :param overwrite: True to download the file even if it is already on disk. Default is False.
+        :type overwrite: bool
         :return: path to downloaded file.
         """
-        filename = urlparse(self['href'])[2].split('/')[-1]
-
-        if dir:
-            filename = os.path.join(dir, filename)
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-
-        try:
-            response = Utils.safe_request(self['href'], stream=True)
+        filename = asset_filename(self['href'], dir)
 
-            from tqdm import tqdm
-
-            with tqdm.wrapattr(open(filename, 'wb'), 'write', miniters=1,
-                        total=int(response.headers.get('content-length', 0)),
-                        desc=filename) as fout:
-                for chunk in response.iter_content(chunk_size=4096):
-                    fout.write(chunk)
-
-        except ImportError:
-            with open(filename, 'wb') as f:
-                shutil.copyfileobj(response.raw, f)
-
-        return filename
+        with Progress(desc=filename) as progress:
+            return download_file(self['href'], filename, session=self._session, chunk_size=chunk_size,
+                                 progress=progress, resume=resume, segments=segments, overwrite=overwrite)
 
 
 class Geometry(dict):
@@ -106,7 +97,7 @@ class Properties(dict):
         :param data: Dict with Properties metadata.
         """
         super(Properties, self).__init__(data or {})
-        self._providers = [Provider(p) for p in self['providers']] if 'providers' in self else []
+        self._providers = None
 
     @property
     def datetime(self):
@@ -121,6 +112,8 @@ class Properties(dict):
     @property
     def providers(self):
         """:return: the providers property."""
+        if self._providers is None:
+            self._providers = [Provider(p) for p in self['providers']] if 'providers' in self else []
         return self._providers
 
     @property
@@ -141,22 +134,24 @@ class Properties(dict):
 class Item(dict):
     """The GeoJSON Feature of a STAC Item."""
 
-    def __init__(self, data, validate=False):
+    def __init__(self, data, validate=False, session=None):
         """Initialize instance with dictionary data.
 
         :param data: Dict with Item metadata.
         :param validate: true if the Item should be validate using its jsonschema. Default is False.
+        :param session: (optional) The HTTP session used to request the Item assets.
         """
         self._validate = validate
+        self._session = session
         super(Item, self).__init__(data or {})
 
-        self._schema = json.loads(resource_string(__name__, f'jsonschemas/{self.stac_version}/item.json'))
-
         if self._validate:
-            Utils.validate(self)
+            Utils.validate(self, 'item')
 
-        self._assets = {key: Asset(value) for key,value in self['assets'].items()} if 'assets' in self else {}
+        self._assets = {key: Asset(value, self._session) for key,value in self['assets'].items()} if 'assets' in self else {}
         self._links = [Link(link) for link in self['links']] if 'links' in self else []
+        self._geometry = None
+        self._properties = None
 
     @property
     def stac_version(self):
@@ -186,12 +181,16 @@ class Item(dict):
     @property
     def geometry(self):
         """:return: the Item Geometry."""
-        return Geometry(self['geometry'])
+        if self._geometry is None:
+            self._geometry = Geometry(self['geometry'])
+        return self._geometry
 
     @property
     def properties(self):
         """:return: the Item properties."""
-        return Properties(self['properties'])
+        if self._properties is None:
+            self._properties = Properties(self['properties'])
+        return self._properties
 
     @property
     def links(self):
@@ -206,27 +205,39 @@ class Item(dict):
     @property
     def schema(self):
         """:return: the Collection jsonschema."""
-        return self._schema
+        return Utils.schema(self.stac_version, 'item')
 
     def _repr_html_(self): # pragma: no cover
         """HTML repr."""
         return Utils.render_html('item.html', item=self)
 
-    def download(self, dir=None): # pragma: no cover
-        """Download an asset given a band name.
+    def download(self, dir=None, assets=None, workers=1): # pragma: no cover
+        """Download the Item assets.
 
         :param dir: Directory path to download the asset, if left None,
                     the asset will be downloaded to the current
                     working directory.
-        :return: path to downloaded file.
+        :param assets: (optional) The asset keys to download. Defaults to all the assets.
+        :type assets: Iterable[str]
+        :param workers: The number of assets downloaded at once. Default is 1.
+        :type workers: int
+        :return: a dict with the path to each downloaded file.
         """
+        if workers > 1:
+            manager = DownloadManager(self._session, workers=workers, item_dirs=False)
+            summary = manager.download(self, dir=dir, assets=assets)
+            for result in summary.failed:
+                raise result.error
+            return {result.asset: result.path for result in summary}
+
         output = dict()
         for asset_name, asset in self.assets.items():
-            output[asset_name] = asset.download(dir=dir)
+            if assets is None or asset_name in assets:
+                output[asset_name] = asset.download(dir=dir)
 
         return output
 
-    def read(self, band_name, window=None, bbox=None, crs=None): # pragma: no cover
+    def read(self, band_name, window=None, bbox=None, crs=None, pool=None): # pragma: no cover
         """Read an asset given a band name.
 
         Notes:
@@ -235,6 +246,8 @@ class Item(dict):
 
                 pip install stac.py[geo]
 
+        The dataset is kept open in a pool for the next reads, see :class:`stac.raster.DatasetPool`.
+
         :param band_name: Band name used in the asset
         :type band_name: str
         :param window: window crop
@@ -242,48 +255,122 @@ class Item(dict):
         :param bbox: The bounding box
         :type bbox: Union[str,Tuple[float],List[float],BaseGeometry]
         :param crs: The Coordinate Reference System
+        :param pool: (optional) The pool of open datasets. Defaults to :data:`stac.raster.default_pool`.
+        :type pool: stac.raster.DatasetPool
         :return: the asset as a numpy array
         :rtype: numpy.ndarray
         """
-        import rasterio
-        from rasterio.crs import CRS
-        from rasterio.warp import transform
-        from rasterio.windows import from_bounds
+        from .raster import bbox_window, cog_env, default_pool
 
-        # Check Authorization
-        _ = Utils.safe_request(self.assets[band_name]['href'], method='head')
+        with cog_env(), (pool or default_pool).dataset(self.assets[band_name]['href'], self._session) as dataset:
+            if bbox:
+                window = bbox_window(dataset, bbox, crs)
 
-        source_crs = CRS.from_string('EPSG:4326')
-        if crs:
-            source_crs = CRS.from_string(crs)
+            return dataset.read(1, window=window)
 
-        with rasterio.open(self.assets[band_name]['href']) as dataset:
-            if bbox:
-                bbox = Utils.build_bbox(bbox)
+    def read_bands(self, band_names, window=None, bbox=None, crs=None, out_shape=None, workers=None, env=None,
+                   pool=None):
+        """Read the same window of several bands at once.
 
-                w, s, e, n = bbox.bounds
+        Notes:
+            You must install the extra `geo` containing the `rasterio` and `Shapely` library
+            in order to use this method:
 
-                t = transform(source_crs, dataset.crs, [w, e], [s, n])
-                window = from_bounds(t[0][0], t[1][0], t[0][1], t[1][1], dataset.transform)
+                pip install stac.py[geo]
 
-            asset = dataset.read(1, window=window)
+        The bands are read concurrently with the COG settings of :data:`stac.raster.COG_ENV`,
+        see :func:`stac.raster.read_bands`.
 
-        return asset
+        :param band_names: Band names used in the assets
+        :type band_names: List[str]
+        :param window: window crop
+        :type window: raster.windows.Window
+        :param bbox: The bounding box
+        :type bbox: Union[str,Tuple[float],List[float],BaseGeometry]
+        :param crs: The Coordinate Reference System
+        :param out_shape: (optional) The (rows, columns) shape of the bands.
+        :type out_shape: Tuple[int,int]
+        :param workers: (optional) The number of threads. Defaults to one per band.
+        :type workers: int
+        :param env: (optional) GDAL configuration options overriding the COG settings.
+        :type env: dict
+        :param pool: (optional) The pool of open datasets. Defaults to :data:`stac.raster.default_pool`.
+        :type pool: stac.raster.DatasetPool
+        :return: the bands as a (band, y, x) numpy array
+        :rtype: numpy.ndarray
+        """
+        from .raster import read_bands
+
+        return read_bands([self.assets[band_name]['href'] for band_name in band_names], window=window,
+                          bbox=bbox, crs=crs, out_shape=out_shape, workers=workers,
+                          session=self._session, env=env, pool=pool)
+
+
+class ItemSequence(Sequence):
+    """A read-only view over a list of GeoJSON Features that builds each Item on access.
+
+    The Features are neither copied nor kept as Items: an Item is created every
+    time one is indexed or iterated over.
+    """
+
+    def __init__(self, features, validate=False, session=None, item_class=None):
+        """Initialize the view over a list of Features.
+
+        :param features: The list of GeoJSON Features.
+        :param validate: true if the Items should be validate using its jsonschema. Default is False.
+        :param session: (optional) The HTTP session used to request the Items assets.
+        :param item_class: (optional) The class of the Items, :class:`Item` or :class:`stac.compact.CompactItem`.
+            Default is :class:`Item`.
+        """
+        self._features = features
+        self._validate = validate
+        self._session = session
+        self._item_class = item_class or Item
+
+    def __len__(self):
+        """Return the number of Features."""
+        return len(self._features)
+
+    def __getitem__(self, index):
+        """Return the Item at the given index, or a view over a slice of the Features."""
+        if isinstance(index, slice):
+            return ItemSequence(self._features[index], self._validate, self._session, self._item_class)
+        return self._item_class(self._features[index], self._validate, self._session)
+
+    def __iter__(self):
+        """Iterate over the Items."""
+        for feature in self._features:
+            yield self._item_class(feature, self._validate, self._session)
 
 
 class ItemCollection(dict):
     """The GeoJSON Feature Collection of STAC Items."""
 
-    def __init__(self, data, validate=False):
+    def __init__(self, data, validate=False, session=None, lazy=False, compact=False):
         """Initialize instance with dictionary data.
 
         :param data: Dict with Item Collection metadata.
         :param validate: true if the Item Collection should be validate using its jsonschema. Default is False.
+        :param session: (optional) The HTTP session used to request the Items assets.
+        :param lazy: true if the Items should only be built when accessed, see :class:`ItemSequence`.
+            Default is False.
+        :param compact: true if the Items should be compact views over the Features, which are not
+            copied, see :class:`stac.compact.CompactItem`. Default is False.
         """
         self._validate = validate
+        self._session = session
         super(ItemCollection, self).__init__(data or {})
 
-        self._features = [Item(i, self._validate) for i in self['features']] if 'features' in self else []
+        item_class = Item
+        if compact:
+            from .compact import CompactItem
+
+            item_class = CompactItem
+
+        if lazy:
+            self._features = ItemSequence(self.get('features', []), self._validate, self._session, item_class)
+        else:
+            self._features = [item_class(i, self._validate, self._session) for i in self['features']] if 'features' in self else []
         self._links = [Link(i) for i in self['links']] if 'links' in self else []
 
     @property
@@ -301,6 +388,76 @@ class ItemCollection(dict):
         """:return: the Item Collection list of GeoJSON Features."""
         return self._links
 
+    def download(self, dir=None, assets=None, workers=8, per_host=4, progress=True):
+        """Download the assets of all Items at once, see :class:`stac.download.DownloadManager`.
+
+        The assets of each Item are saved in a sub-directory named after the Item id.
+
+        :param dir: Directory path to download the assets, if left None,
+                    the assets will be downloaded to the current
+                    working directory.
+        :param assets: (optional) The asset keys to download. Defaults to all the assets.
+        :type assets: Iterable[str]
+        :param workers: The maximum number of simultaneous downloads. Default is 8.
+        :type workers: int
+        :param per_host: The maximum number of simultaneous downloads from a host. Default is 4.
+        :type per_host: int
+        :param progress: False to hide the aggregate progress bar. Default is True.
+        :type progress: bool
+        :return: the summary of downloaded and failed assets.
+        :rtype: stac.download.DownloadSummary
+        """
+        manager = DownloadManager(self._session, workers=workers, per_host=per_host, progress=progress)
+        return manager.download(self, dir=dir, assets=assets)
+
+    def to_cube(self, bands, bbox, **kwargs):
+        """Read a bbox of the given bands of the Items into a (time, band, y, x) array.
+
+        See :func:`stac.datacube.build_cube` for the supported arguments.
+
+        :param bands: The band names used in the assets.
+        :type bands: List[str]
+        :param bbox: The bounding box.
+        :type bbox: Union[str,Tuple[float],List[float],BaseGeometry]
+
+        :return: the cube and the datetime of each time step.
+        :rtype: Tuple[numpy.ndarray,List[str]]
+        """
+        from .datacube import build_cube
+
+        kwargs.setdefault('session', self._session)
+        return build_cube(self, bands, bbox, **kwargs)
+
+    def to_arrow(self):
+        """Convert the Items to an Arrow table, see :func:`stac.export.to_arrow`.
+
+        :rtype: pyarrow.Table
+        """
+        from .export import to_arrow
+
+        return to_arrow(self)
+
+    def to_pandas(self):
+        """Convert the Items to a pandas DataFrame, see :func:`stac.export.to_arrow`.
+
+        :rtype: pandas.DataFrame
+        """
+        from .export import to_pandas
+
+        return to_pandas(self)
+
+    def to_geoparquet(self, path, **writer_kwargs):
+        """Write the Items to a GeoParquet file, see :func:`stac.export.write_geoparquet`.
+
+        :param path: The GeoParquet file path.
+        :type path: str
+        :return: the number of Items written.
+        :rtype: int
+        """
+        from .export import write_geoparquet
+
+        return write_geoparquet(self, path, **writer_kwargs)
+
     def _repr_html_(self): # pragma: no cover
         """HTML repr."""
         return Utils.render_html('itemcollection.html', itemcollection=self)
@@ -0,0 +1,189 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Pagination over STAC Item results."""
+
+import queue
+import threading
+
+from .item import ItemCollection
+from .utils import Utils
+
+
+class Paginator:
+    """Iterate over the pages of a STAC Item search, following the ``next`` links.
+
+    Only one page is held in memory at a time. The ``next`` link may request
+    the following page using GET (the link href) or POST (the link body,
+    merged with the previous body when ``merge`` is true). STAC 0.7.0 servers,
+    which do not advertise a ``next`` link, are paginated by incrementing the
+    ``page`` parameter when it was given. The pagination stops when a page
+    returns the same Items as the previous one, e.g. a server ignoring ``page``.
+
+    With ``prefetch`` greater than zero, the following pages are requested on
+    a background thread while the caller processes the current one.
+    """
+
+    def __init__(self, url, params=None, validate=False, session=None, max_items=None, prefetch=0, compact=False,
+                 stac_version=None, **request_kwargs):
+        """Initialize the paginator with the first request.
+
+        :param url: The URL of the STAC items or search endpoint.
+        :type url: str
+        :param params: (optional) A dictionary with valid STAC query parameters.
+        :type params: dict
+        :param validate: true if the Items should be validate using its jsonschema. Default is False.
+        :param session: (optional) The HTTP session used to send the requests.
+        :type session: requests.Session
+        :param max_items: (optional) The maximum number of Items to iterate over.
+        :type max_items: int
+        :param prefetch: The number of pages requested ahead of the caller. Default is 0 (no read-ahead).
+        :type prefetch: int
+        :param compact: true to iterate over compact Items, see :class:`stac.compact.CompactItem`. Default is False.
+        :type compact: bool
+        :param stac_version: (optional) The STAC version of the server, the ``page`` parameter is only
+            incremented for '0.7.0'.
+        :type stac_version: str
+        """
+        self._url = url
+        self._params = dict(params) if params is not None else None
+        self._validate = validate
+        self._session = session
+        self._max_items = max_items
+        self._prefetch = prefetch
+        self._compact = compact
+        self._stac_version = stac_version
+        self._request_kwargs = request_kwargs
+
+    def _fetch(self, url, params, method):
+        """Retrieve a page of Items."""
+        if method == 'POST':
+            data = Utils._post(url, params, session=self._session, **self._request_kwargs)
+        else:
+            data = Utils._get(url, params=params, session=self._session, **self._request_kwargs)
+
+        # Items are yielded one at a time, so they are only built when consumed, unless the
+        # page is prepared on the prefetch thread.
+        return ItemCollection(data, self._validate, self._session, lazy=not self._prefetch, compact=self._compact)
+
+    @staticmethod
+    def _next_request(page, url, params, method, stac_version=None):
+        """Return the request (url, params, method) for the page after the given one, or None."""
+        for link in page.links:
+            if link.rel != 'next':
+                continue
+
+            if link.get('method', 'GET').upper() == 'POST':
+                body = link.get('body') or {}
+                if link.get('merge', False):
+                    body = {**(params or {}), **body}
+                return link.href, body, 'POST'
+
+            return link.href, None, 'GET'
+
+        if stac_version == '0.7.0' and params is not None and 'page' in params and page.features:
+            if 'limit' in params and len(page.features) < int(params['limit']):
+                return None
+            return url, dict(params, page=int(params['page']) + 1), method
+
+        return None
+
+    @staticmethod
+    def _page_ids(page):
+        """Return the ids of the Items of a page."""
+        return [feature.get('id') for feature in page.get('features') or []]
+
+    def pages(self):
+        """Iterate over the result pages.
+
+        :rtype: Iterator[ItemCollection]
+        """
+        if self._prefetch > 0:
+            return self._prefetched_pages()
+        return self._sequential_pages()
+
+    def _sequential_pages(self):
+        """Request each page only when the previous one was consumed."""
+        request = (self._url, self._params, None)
+        previous_ids = None
+
+        while request is not None:
+            page = self._fetch(*request)
+
+            ids = self._page_ids(page)
+            if ids and ids == previous_ids:
+                break
+            previous_ids = ids
+
+            yield page
+
+            next_request = self._next_request(page, *request, self._stac_version)
+            if next_request == request:
+                break
+            request = next_request
+
+    def _prefetched_pages(self):
+        """Request the pages on a background thread, up to ``prefetch`` pages ahead."""
+        pages = queue.Queue(maxsize=self._prefetch)
+        stop = threading.Event()
+
+        def put(entry):
+            while not stop.is_set():
+                try:
+                    pages.put(entry, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page in self._sequential_pages():
+                    if not put((page, None)) or stop.is_set():
+                        return
+                put((None, None))
+            except Exception as e:
+                put((None, e))
+
+        worker = threading.Thread(target=produce, name='stac-prefetch', daemon=True)
+        worker.start()
+
+        try:
+            while True:
+                page, error = pages.get()
+                if error is not None:
+                    raise error
+                if page is None:
+                    return
+                yield page
+        finally:
+            # Not joined: the worker may be waiting for a page, it exits once the request is over.
+            stop.set()
+
+    def __iter__(self):
+        """Iterate over the Items of all pages, up to ``max_items``.
+
+        :rtype: Iterator[Item]
+        """
+        if self._max_items is not None and self._max_items <= 0:
+            return
+
+        count = 0
+        pages = self.pages()
+        try:
+            for page in pages:
+                for item in page.features:
+                    yield item
+
+                    count += 1
+                    if self._max_items is not None and count >= self._max_items:
+                        return
+
+                if not page.features:
+                    return
+        finally:
+            pages.close()
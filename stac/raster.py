@@ -0,0 +1,265 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""Windowed reads of the raster assets of STAC Items.
+
+Notes:
+    You must install the extra `geo` containing the `rasterio` and `Shapely` library
+    in order to use this module:
+
+        pip install stac.py[geo]
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .utils import Utils
+
+COG_ENV = {
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+    'GDAL_HTTP_MULTIPLEX': 'YES',
+    'GDAL_HTTP_VERSION': '2',
+    'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+    'VSI_CACHE': 'TRUE',
+    'GDAL_CACHEMAX': 512,
+}
+"""The GDAL configuration options tuned for reading Cloud Optimized GeoTIFFs over HTTP.
+
+No ``CPL_VSIL_CURL_ALLOWED_EXTENSIONS`` is set, so that the assets in other formats (e.g. PNG, JP2
+or NetCDF) can still be read. Pass it to :func:`cog_env` to skip the requests of GDAL sidecar files.
+"""
+
+
+def cog_env(**options):
+    """Return a rasterio environment with the COG settings of :data:`COG_ENV`.
+
+    The GDAL options are thread-local: each thread reading a dataset must enter its own environment.
+
+    :param options: (optional) GDAL configuration options overriding :data:`COG_ENV`.
+
+    :rtype: rasterio.Env
+    """
+    import rasterio
+
+    return rasterio.Env(**dict(COG_ENV, **options))
+
+
+def open_dataset(href, session=None):
+    """Open a raster dataset.
+
+    When the dataset can not be opened, the href is requested to raise the HTTP error
+    (e.g. a missing authorization) instead of the GDAL one.
+
+    :param href: The raster URL or file path.
+    :type href: str
+    :param session: (optional) The HTTP session used to check the URL on failure.
+
+    :rtype: rasterio.io.DatasetReader
+    """
+    import rasterio
+    from rasterio.errors import RasterioIOError
+
+    try:
+        return rasterio.open(href)
+    except RasterioIOError:
+        if href.startswith(('http://', 'https://')):
+            Utils.safe_request(href, method='head', session=session)
+        raise
+
+
+class DatasetPool:
+    """A thread-safe LRU pool of open raster datasets, keyed by href.
+
+    A dataset is used by a single thread at a time: it is taken from the pool while
+    read and put back afterwards, unless the read failed. Concurrent reads of the
+    same href open additional datasets. When more than ``capacity`` datasets are
+    idle, the least recently used ones are closed. Hence, the header of a raster is
+    fetched once for many reads.
+    """
+
+    def __init__(self, capacity=32):
+        """Create an empty pool.
+
+        :param capacity: The maximum number of idle open datasets. Default is 32.
+        :type capacity: int
+        """
+        self._capacity = capacity
+        self._idle = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def capacity(self):
+        """:return: the maximum number of idle open datasets."""
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity):
+        """Set the maximum number of idle open datasets, closing the exceeding ones."""
+        self._capacity = capacity
+        self._evict()
+
+    @contextmanager
+    def dataset(self, href, session=None):
+        """Return a context manager over an open dataset of the href, see :func:`open_dataset`.
+
+        :param href: The raster URL or file path.
+        :type href: str
+        :param session: (optional) The HTTP session used to check the URL on failure.
+
+        :rtype: rasterio.io.DatasetReader
+        """
+        dataset = None
+        with self._lock:
+            datasets = self._idle.get(href)
+            if datasets:
+                dataset = datasets.pop()
+                if not datasets:
+                    del self._idle[href]
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if dataset is None:
+            dataset = open_dataset(href, session)
+
+        try:
+            yield dataset
+        except BaseException:
+            dataset.close()
+            raise
+        else:
+            with self._lock:
+                self._idle.setdefault(href, []).append(dataset)
+                self._idle.move_to_end(href)
+            self._evict()
+
+    def _evict(self):
+        """Close the least recently used datasets until at most ``capacity`` are idle."""
+        closing = []
+        with self._lock:
+            while len(self) > self._capacity:
+                href, datasets = next(iter(self._idle.items()))
+                closing.append(datasets.pop(0))
+                if not datasets:
+                    del self._idle[href]
+
+        for dataset in closing:
+            dataset.close()
+
+    def clear(self):
+        """Close all the idle datasets."""
+        with self._lock:
+            idle, self._idle = self._idle, OrderedDict()
+
+        for datasets in idle.values():
+            for dataset in datasets:
+                dataset.close()
+
+    def __len__(self):
+        """Return the number of idle open datasets."""
+        return sum(len(datasets) for datasets in self._idle.values())
+
+    def __repr__(self):
+        """Return the string representation of a DatasetPool object."""
+        return f'<DatasetPool [{len(self)} open, {self.hits} hits, {self.misses} misses]>'
+
+
+default_pool = DatasetPool()
+"""The pool of datasets used by default to read the Items assets."""
+
+
+def bbox_window(dataset, bbox, crs=None, cache=None):
+    """Return the window of a dataset covering a bounding box.
+
+    :param dataset: The raster dataset.
+    :type dataset: rasterio.io.DatasetReader
+    :param bbox: The bounding box.
+    :type bbox: Union[str,Tuple[float],List[float],BaseGeometry]
+    :param crs: (optional) The Coordinate Reference System of the bbox. Default is EPSG:4326.
+    :type crs: str
+    :param cache: (optional) A dict keeping the reprojected bbox bounds by dataset CRS.
+    :type cache: dict
+
+    :rtype: rasterio.windows.Window
+    """
+    from rasterio.crs import CRS
+    from rasterio.warp import transform
+    from rasterio.windows import from_bounds
+
+    key = dataset.crs.to_string()
+    if cache is not None and key in cache:
+        bounds = cache[key]
+    else:
+        w, s, e, n = Utils.build_bbox(bbox).bounds
+        t = transform(CRS.from_string(crs or 'EPSG:4326'), dataset.crs, [w, e], [s, n])
+        bounds = t[0][0], t[1][0], t[0][1], t[1][1]
+        if cache is not None:
+            cache[key] = bounds
+
+    return from_bounds(*bounds, dataset.transform)
+
+
+def _resize(array, shape):
+    """Resample a 2D array to the given shape with the nearest neighbour."""
+    import numpy
+
+    rows = (numpy.arange(shape[0]) * array.shape[0] // shape[0])
+    columns = (numpy.arange(shape[1]) * array.shape[1] // shape[1])
+    return array[rows[:, numpy.newaxis], columns]
+
+
+def read_bands(hrefs, window=None, bbox=None, crs=None, out_shape=None, workers=None, session=None, env=None,
+               pool=None):
+    """Read the same window of several single band rasters at once.
+
+    The rasters are taken from a pool of open datasets and read concurrently, each
+    thread in its own environment with the COG settings. The bbox is reprojected
+    once per raster CRS. Unless
+    ``out_shape`` is given, the bands with a resolution different from the first one
+    are resampled (nearest neighbour) to its shape.
+
+    :param hrefs: The raster URLs or file paths, one per band.
+    :type hrefs: List[str]
+    :param window: (optional) The window to read.
+    :type window: rasterio.windows.Window
+    :param bbox: (optional) The bounding box to read, instead of a window.
+    :type bbox: Union[str,Tuple[float],List[float],BaseGeometry]
+    :param crs: (optional) The Coordinate Reference System of the bbox. Default is EPSG:4326.
+    :type crs: str
+    :param out_shape: (optional) The (rows, columns) shape of the bands.
+    :type out_shape: Tuple[int,int]
+    :param workers: (optional) The number of threads. Defaults to one per band.
+    :type workers: int
+    :param session: (optional) The HTTP session used to check the URLs on failure.
+    :param env: (optional) GDAL configuration options overriding :data:`COG_ENV`.
+    :type env: dict
+    :param pool: (optional) The pool of open datasets. Defaults to :data:`default_pool`.
+    :type pool: DatasetPool
+
+    :return: the bands as a (band, y, x) numpy array.
+    :rtype: numpy.ndarray
+    """
+    import numpy
+
+    env = env or dict()
+    pool = pool or default_pool
+    bounds = dict()
+
+    def read(href):
+        with cog_env(**env), pool.dataset(href, session) as dataset:
+            band_window = bbox_window(dataset, bbox, crs, bounds) if bbox else window
+            return dataset.read(1, window=band_window, out_shape=out_shape)
+
+    with ThreadPoolExecutor(max_workers=workers or len(hrefs)) as executor:
+        bands = list(executor.map(read, hrefs))
+
+    shape = bands[0].shape
+    return numpy.stack([band if band.shape == shape else _resize(band, shape) for band in bands])
@@ -0,0 +1,303 @@
+#
+# This file is part of Python Client Library for STAC.
+# Copyright (C) 2019-2021 INPE.
+#
+# Python Client Library for STAC is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+#
+"""HTTP session shared by the STAC client objects."""
+
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Metrics(dict):
+    """Thread-safe counters of the requests sent by a :class:`Session`.
+
+    The counters are ``requests``, the number of HTTP requests sent, and ``retries``,
+    the number of them repeated by the :class:`RetryPolicy`.
+    """
+
+    def __init__(self):
+        """Create the counters set to zero."""
+        super(Metrics, self).__init__(requests=0, retries=0)
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        """Increase a counter."""
+        with self._lock:
+            self[name] = self.get(name, 0) + value
+
+    def reset(self):
+        """Set all the counters to zero."""
+        with self._lock:
+            for name in self:
+                self[name] = 0
+
+
+class RetryPolicy:
+    """When and after how long a failed request is sent again.
+
+    The requests failing with a connection error, a timeout or one of the ``status``
+    codes are retried up to ``max_attempts`` attempts in total. The delay before
+    an attempt is the ``Retry-After`` response header when present, otherwise an
+    exponential backoff ``backoff_factor * 2 ** retry`` with full jitter, both
+    capped to ``max_backoff`` seconds.
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=60.0, jitter=True,
+                 status=(429, 502, 503, 504), retry_after=True):
+        """Create a retry policy.
+
+        :param max_attempts: The maximum number of attempts of a request, 1 to never retry. Default is 3.
+        :type max_attempts: int
+        :param backoff_factor: The base delay in seconds of the exponential backoff. Default is 0.5.
+        :type backoff_factor: float
+        :param max_backoff: The maximum delay in seconds before an attempt. Default is 60.
+        :type max_backoff: float
+        :param jitter: False to wait the whole backoff instead of a random part of it. Default is True.
+        :type jitter: bool
+        :param status: The HTTP status codes of the responses to retry. Default is 429, 502, 503 and 504.
+        :type status: Iterable[int]
+        :param retry_after: False to ignore the ``Retry-After`` response header. Default is True.
+        :type retry_after: bool
+        """
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status = frozenset(status)
+        self.retry_after = retry_after
+
+    def retries(self, attempt, response=None):
+        """Return whether a request is sent again after the given failed attempt.
+
+        :param attempt: The number of the attempt, starting at 0.
+        :type attempt: int
+        :param response: (optional) The response of the attempt, None on connection errors.
+        :type response: requests.Response
+
+        :rtype: bool
+        """
+        if attempt + 1 >= self.max_attempts:
+            return False
+        return response is None or response.status_code in self.status
+
+    def delay(self, attempt, response=None):
+        """Return the number of seconds to wait after the given failed attempt.
+
+        :param attempt: The number of the attempt, starting at 0.
+        :type attempt: int
+        :param response: (optional) The response of the attempt, None on connection errors.
+        :type response: requests.Response
+
+        :rtype: float
+        """
+        if response is not None and self.retry_after and response.headers.get('retry-after'):
+            value = response.headers['retry-after']
+            try:
+                seconds = float(value)
+            except ValueError:
+                try:
+                    seconds = parsedate_to_datetime(value).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    seconds = None
+            if seconds is not None:
+                return min(max(seconds, 0), self.max_backoff)
+
+        backoff = min(self.backoff_factor * 2 ** attempt, self.max_backoff)
+        return random.uniform(0, backoff) if self.jitter else backoff
+
+
+class _HostLimit:
+    """The token bucket and the number of requests in flight of a host."""
+
+    def __init__(self, burst):
+        """Create a full token bucket."""
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.in_flight = 0
+
+
+class RateLimiter:
+    """A per host limit of the request rate and of the number of requests in flight.
+
+    The rate is enforced by a token bucket: ``burst`` requests may be sent at once,
+    then ``rate`` requests per second. The limiter is thread-safe and may be shared
+    by several sessions, threads and asyncio tasks: the threads wait with
+    :meth:`limit`, the tasks with :meth:`limit_async`. For a streamed response,
+    the request is in flight until its headers are received.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """Create a rate limiter.
+
+        :param rate: (optional) The maximum number of requests per second to a host. Default is no limit.
+        :type rate: float
+        :param burst: (optional) The number of requests to a host sent at once before the rate applies.
+            Defaults to ``rate``, at least 1.
+        :type burst: int
+        :param max_in_flight: (optional) The maximum number of simultaneous requests to a host.
+            Default is no limit.
+        :type max_in_flight: int
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate or 1))
+        self.max_in_flight = max_in_flight
+        self._hosts = dict()
+        self._condition = threading.Condition()
+
+    def _host(self, url):
+        """Return the limit of the host of an URL. The condition lock must be held."""
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _HostLimit(self.burst)
+        return self._hosts[host]
+
+    def _reserve(self, limit):
+        """Take a token from the bucket of a host, returning the seconds to wait until it is available."""
+        if self.rate is None:
+            return 0
+
+        now = time.monotonic()
+        limit.tokens = min(self.burst, limit.tokens + (now - limit.updated) * self.rate)
+        limit.updated = now
+        limit.tokens -= 1
+
+        return max(0, -limit.tokens / self.rate)
+
+    def _enter(self, url):
+        """Start a request if a slot is free, returning the seconds to wait before sending it, or None."""
+        with self._condition:
+            limit = self._host(url)
+            if self.max_in_flight is not None and limit.in_flight >= self.max_in_flight:
+                return None
+            limit.in_flight += 1
+            return self._reserve(limit)
+
+    def _exit(self, url):
+        """Finish a request."""
+        with self._condition:
+            self._host(url).in_flight -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def limit(self, url):
+        """Return a context manager holding a request to the host of an URL, blocking the thread until allowed.
+
+        :param url: The request URL.
+        :type url: str
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.max_in_flight is None or
+                                     self._host(url).in_flight < self.max_in_flight)
+            limit = self._host(url)
+            limit.in_flight += 1
+            delay = self._reserve(limit)
+
+        try:
+            if delay:
+                time.sleep(delay)
+            yield
+        finally:
+            self._exit(url)
+
+    @asynccontextmanager
+    async def limit_async(self, url):
+        """Return an asynchronous context manager holding a request to the host of an URL, until allowed.
+
+        :param url: The request URL.
+        :type url: str
+        """
+        import asyncio
+
+        delay = self._enter(url)
+        while delay is None:
+            await asyncio.sleep(0.01)
+            delay = self._enter(url)
+
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self._exit(url)
+
+
+class Session(requests.Session):
+    """A pooled, keep-alive HTTP session for STAC requests.
+
+    A single instance is created by :class:`stac.STAC` and handed to every
+    :class:`stac.Collection`, :class:`stac.Item`, :class:`stac.ItemCollection`
+    and :class:`stac.item.Asset` it builds, so that all of them reuse the same
+    TCP/TLS connections. The failed requests are sent again according to its
+    :class:`RetryPolicy`, and the requests rate may be limited by a :class:`RateLimiter`.
+    """
+
+    def __init__(self, pool_size=10, max_retries=0, keep_alive=True, cache=None, retry=None, rate_limiter=None):
+        """Create a session with a connection pool mounted for HTTP and HTTPS.
+
+        :param pool_size: The maximum number of connections kept open per host. Default is 10.
+        :type pool_size: int
+        :param max_retries: The number of retries on connection errors. Default is 0.
+        :type max_retries: int
+        :param keep_alive: False to close the connection after each request. Default is True.
+        :type keep_alive: bool
+        :param cache: (optional) The cache of the GET responses, see :class:`stac.cache.DiskCache`.
+        :param retry: (optional) The retry policy, or its maximum number of attempts.
+            Defaults to a :class:`RetryPolicy` of 3 attempts.
+        :type retry: Union[RetryPolicy,int]
+        :param rate_limiter: (optional) The per host limit of the requests, see :class:`RateLimiter`.
+        :type rate_limiter: RateLimiter
+        """
+        super(Session, self).__init__()
+
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.keep_alive = keep_alive
+        self.cache = cache
+        self.retry = retry if isinstance(retry, RetryPolicy) else RetryPolicy(**(
+            dict(max_attempts=retry) if retry is not None else dict()))
+        self.rate_limiter = rate_limiter
+        self.metrics = Metrics()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=max_retries)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+
+        self.headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+
+    def request(self, method, url, *args, **kwargs):
+        """Send a request, retrying it according to the retry policy.
+
+        :rtype: requests.Response
+        """
+        attempt = 0
+        while True:
+            self.metrics.increment('requests')
+            try:
+                if self.rate_limiter is not None:
+                    with self.rate_limiter.limit(url):
+                        response = super(Session, self).request(method, url, *args, **kwargs)
+                else:
+                    response = super(Session, self).request(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if not self.retry.retries(attempt):
+                    raise
+                delay = self.retry.delay(attempt)
+            else:
+                if not self.retry.retries(attempt, response):
+                    return response
+                delay = self.retry.delay(attempt, response)
+                response.close()
+
+            self.metrics.increment('retries')
+            time.sleep(delay)
+            attempt += 1
@@ -10,9 +10,12 @@ import warnings
 
 from requests import HTTPError
 
+from .cache import MEMORY_CACHE_TTL, MemoryCache
 from .catalog import Catalog
 from .collection import Collection
 from .item import ItemCollection
+from .pagination import Paginator
+from .session import Session
 from .utils import Utils
 
 
@@ -25,7 +28,9 @@ class STAC:
     :type url: str
     """
 
-    def __init__(self, url, validate=False, access_token=None, **request_kwargs):
+    def __init__(self, url, validate=False, access_token=None, session=None,
+                 pool_size=10, max_retries=0, keep_alive=True, cache=None, memory_cache=None, retry=None,
+                 rate_limiter=None, **request_kwargs):
         """Create a STAC client attached to the given host address (an URL).
 
         :param url: URL for the Root STAC Catalog.
@@ -34,18 +39,45 @@ class STAC:
         :type validate: bool
         :param access_token: Authentication for the STAC API
         :type access_token: str
+        :param session: (optional) The HTTP session shared by all requests. If None,
+            a pooled :class:`stac.session.Session` is created from the following options.
+        :type session: requests.Session
+        :param pool_size: The maximum number of connections kept open per host. Default is 10.
+        :type pool_size: int
+        :param max_retries: The number of retries on connection errors. Default is 0.
+        :type max_retries: int
+        :param keep_alive: False to close the connection after each request. Default is True.
+        :type keep_alive: bool
+        :param cache: (optional) A persistent cache of the GET responses, see :class:`stac.cache.DiskCache`.
+        :type cache: stac.cache.DiskCache
+        :param memory_cache: (optional) The in-memory cache of the Collection and Item objects.
+            Defaults to a :class:`stac.cache.MemoryCache` of 1024 entries kept for
+            :data:`stac.cache.MEMORY_CACHE_TTL` seconds, after which they are requested again.
+            Give ``MemoryCache(max_entries=0)`` to always request them.
+        :type memory_cache: stac.cache.MemoryCache
+        :param retry: (optional) The retry policy of the requests, or its maximum number of attempts.
+            Defaults to a :class:`stac.session.RetryPolicy` of 3 attempts.
+        :type retry: Union[stac.session.RetryPolicy,int]
+        :param rate_limiter: (optional) The per host limit of the requests, shared by the Collections
+            and Items of this client, see :class:`stac.session.RateLimiter`.
+        :type rate_limiter: stac.session.RateLimiter
         """
         self._url = url.rstrip('/')
         self._collections = dict()
         self._catalog = dict()
         self._validate = validate
         self._access_token = f'?access_token={access_token}' if access_token else ''
+        self._session = session or Session(pool_size=pool_size, max_retries=max_retries, keep_alive=keep_alive,
+                                           retry=retry, rate_limiter=rate_limiter)
+        if cache is not None:
+            self._session.cache = cache
+        self._cache = memory_cache if memory_cache is not None else MemoryCache(ttl=MEMORY_CACHE_TTL)
         self._request_kwargs = request_kwargs
 
     @property
     def conformance(self): # pragma: no cover
         """Return the list of conformance classes that the server conforms to."""
-        return Utils._get('{}/conformance'.format(self._url), **self._request_kwargs)
+        return Utils._get('{}/conformance'.format(self._url), session=self._session, **self._request_kwargs)
 
     @property
     def catalog(self):
@@ -56,7 +88,7 @@ class STAC:
         """
         if not self._catalog:
             url = f'{self._url}{self._access_token}'
-            response = Utils._get(url, **self._request_kwargs)
+            response = Utils._get(url, session=self._session, **self._request_kwargs)
 
             self._catalog = Catalog(response, self._validate)
 
@@ -77,13 +109,33 @@ class STAC:
     def collections(self):
         """Return all available collections.
 
+        The collections are kept in the memory cache: while it holds them (by default for
+        :data:`stac.cache.MEMORY_CACHE_TTL` seconds), they are not requested again, and the
+        Collection objects whose metadata did not change are reused.
+
         :returns: A dict containing all collections.
         :rype: dict
         """
+        cached = self._cache.get(('collections', self._url))
+        if cached is not None:
+            self._collections = dict(cached)
+            return self._collections
+
         url = '/'.join(self._url.split('/')[:-1]) if self._url.endswith('/stac') else self._url
-        data = Utils._get(f'{url.rstrip("/")}/collections{self._access_token}', **self._request_kwargs)
-        self._collections = {collection['id']: Collection(collection, self._validate, **self._request_kwargs)
-                             for collection in data['collections']}
+        data = Utils._get(f'{url.rstrip("/")}/collections{self._access_token}',
+                          session=self._session, **self._request_kwargs)
+
+        self._collections = dict()
+        for collection_data in data['collections']:
+            key = ('collection', self._url, collection_data['id'])
+            collection = self._cache.pop(key)
+            if collection is None or collection != collection_data:
+                collection = Collection(collection_data, self._validate, self._session, self._cache,
+                                        **self._request_kwargs)
+            self._cache.set(key, collection)
+            self._collections[collection.id] = collection
+
+        self._cache.set(('collections', self._url), dict(self._collections))
 
         return self._collections
 
@@ -97,22 +149,57 @@ class STAC:
         :returns: A STAC Collection.
         :rtype: dict
         """
-        if collection_id in self._collections.keys() and \
-            self._collections[collection_id] is not None:
-            return self._collections[collection_id]
+        key = ('collection', self._url, collection_id)
+        collection = self._cache.get(key)
+        if collection is not None:
+            return collection
         try:
             url = '/'.join(self._url.split('/')[:-1]) if self._url.endswith('/stac') else self._url
             data = Utils._get(f'{url.rstrip("/")}/collections/{collection_id}{self._access_token}',
-                              **self._request_kwargs)
-            self._collections[collection_id] = Collection(data, self._validate, **self._request_kwargs)
+                              session=self._session, **self._request_kwargs)
+            collection = Collection(data, self._validate, self._session, self._cache, **self._request_kwargs)
         except HTTPError as e:
             raise KeyError(f'Could not retrieve information for collection: {collection_id}')
-        return self._collections[collection_id]
+        self._cache.set(key, collection)
+        self._collections[collection_id] = collection
+        return collection
 
 
-    def search(self, **query):
+    def get_items(self, collection_id, ids, batch_size=100, workers=8):
+        """Retrieve many Items of a collection by id.
+
+        The ids are packed into searches when the server announces the STAC API item search,
+        and otherwise requested concurrently one by one, see :meth:`stac.Collection.get_items_many`.
+
+        :param collection_id: A str for a given collection_id.
+        :type collection_id: str
+        :param ids: The STAC Item ids.
+        :type ids: Iterable[str]
+        :param batch_size: The number of ids of each search. Default is 100.
+        :type batch_size: int
+        :param workers: The maximum number of simultaneous requests. Default is 8.
+        :type workers: int
+
+        :return: the result of each id, in the given order.
+        :rtype: List[stac.collection.ItemResult]
+        """
+        if not self._catalog:  # pragma: no cover
+            self.catalog
+
+        search_url = None
+        if any(link.rel == 'search' for link in self._catalog.links) or \
+                any('item-search' in conformance for conformance in self._catalog.get('conformsTo', [])):
+            search_url = f'{self._url}/search{self._access_token}'
+
+        return self.collection(collection_id).get_items_many(ids, search_url, batch_size, workers)
+
+    def search(self, lazy=False, compact=False, **query):
         """Retrieve Items matching a filter.
 
+        :param lazy: true if the Items should only be built when accessed. Default is False.
+        :type lazy: bool
+        :param compact: true for compact Items, see :class:`stac.compact.CompactItem`. Default is False.
+        :type compact: bool
         :param query: (optional) A dictionary with valid STAC query parameters from query kwarg.
         :type query: dict
 
@@ -127,14 +214,91 @@ class STAC:
         if 'bbox' in query:
             query['bbox'] = Utils.build_bbox_as_str(query['bbox'])
 
-        data = Utils._get(url, params=query, **self._request_kwargs)
-        return ItemCollection(data, self._validate)
+        data = Utils._get(url, params=query, session=self._session, **self._request_kwargs)
+        return ItemCollection(data, self._validate, self._session, lazy, compact)
+
+    def search_iter(self, max_items=None, prefetch=0, tiles=None, periods=None, timeout=None, compact=False,
+                    workers=8, **query):
+        """Iterate over all Items matching a filter, following the result pages.
+
+        The pages are requested lazily, as the Items are consumed.
+
+        With ``tiles`` and/or ``periods``, the ``bbox`` and/or the ``datetime`` interval are
+        split into smaller queries, up to ``workers`` of them paginated in parallel. The
+        Items are then returned in arrival order, without duplicates.
+
+        :param max_items: (optional) The maximum number of Items to return.
+        :type max_items: int
+        :param prefetch: The number of pages requested ahead on a background thread. Default is 0.
+        :type prefetch: int
+        :param tiles: (optional) The number of tiles of the bbox along each axis, as an int or a (columns, rows) tuple.
+        :type tiles: Union[int,Tuple[int,int]]
+        :param periods: (optional) The number of periods of the datetime interval.
+        :type periods: int
+        :param timeout: (optional) The maximum number of seconds to wait for the next Item of a split query.
+        :type timeout: float
+        :param compact: true to iterate over compact Items, see :class:`stac.compact.CompactItem`. Default is False.
+        :type compact: bool
+        :param workers: The maximum number of split queries paginated at a time. Default is 8.
+        :type workers: int
+        :param query: (optional) A dictionary with valid STAC query parameters from query kwarg.
+        :type query: dict
+
+        :returns: An iterator of STAC Items.
+        :rtype: Iterator[Item]
+        """
+        if not self._catalog:  # pragma: no cover
+            self.catalog
+
+        if tiles is not None or periods is not None:
+            from .federation import merge_searches, split_query
+
+            searches = {f'{index}': (lambda sub=sub: self.search_iter(prefetch=prefetch, compact=compact, **sub))
+                        for index, sub in enumerate(split_query(query, tiles, periods))}
+            errors = dict()
+
+            yield from merge_searches(searches, timeout=timeout, errors=errors, max_items=max_items,
+                                      workers=workers)
+
+            if errors:
+                raise next(iter(errors.values()))
+            return
+
+        url = f'{self._url}/search{self._access_token}'
+
+        if 'bbox' in query:
+            query['bbox'] = Utils.build_bbox_as_str(query['bbox'])
+
+        yield from Paginator(url, query, self._validate, self._session, max_items, prefetch, compact,
+                             self._catalog.get('stac_version'), **self._request_kwargs)
 
     @property
     def url(self):
         """Return the STAC server instance URL."""
         return self._url
 
+    @property
+    def memory_cache(self):
+        """Return the in-memory cache of the Collection and Item objects."""
+        return self._cache
+
+    @property
+    def session(self):
+        """Return the HTTP session shared by the STAC requests."""
+        return self._session
+
+    def close(self):
+        """Close the HTTP session and release its pooled connections."""
+        self._session.close()
+
+    def __enter__(self):
+        """Enter the runtime context of a STAC client."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the STAC client when leaving the runtime context."""
+        self.close()
+
     def __repr__(self):
         """Return the string representation of a STAC object."""
         text = 'stac("{}")'.format(self.url)
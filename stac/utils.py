@@ -7,23 +7,51 @@
 #
 """Utility data structures and algorithms."""
 
+import json
+import os
+import threading
 from collections.abc import Iterable
+from functools import lru_cache
 
-import jinja2
 import requests
-from jsonschema import RefResolver, validate
-from pkg_resources import resource_filename
 
-base_schemas_path = resource_filename(__name__, 'jsonschemas/')
-templateLoader = jinja2.FileSystemLoader( searchpath=resource_filename(__name__, 'templates/'))
-templateEnv = jinja2.Environment( loader=templateLoader )
+_validation_lock = threading.Lock()
+
+
+def _resource_path(name):
+    """Return the file system path of a directory bundled in the package."""
+    try:
+        from importlib.resources import files
+    except ImportError:  # pragma: no cover
+        return os.path.join(os.path.dirname(__file__), name)
+
+    return str(files(__package__).joinpath(name))
+
+
+@lru_cache(maxsize=None)
+def _template_env():
+    """Return the Jinja2 environment of the HTML templates, created on first use."""
+    import jinja2
+
+    return jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=_resource_path('templates')))
+
+
+def __getattr__(name):
+    """Build the module attributes which require a costly import on first access."""
+    if name == 'base_schemas_path':
+        return _resource_path('jsonschemas') + os.sep
+    if name == 'templateEnv':
+        return _template_env()
+    if name == 'templateLoader':
+        return _template_env().loader
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 class Utils:
     """Utils STAC object."""
 
     @staticmethod
-    def _get(url, params=None, **request_kwargs):
+    def _get(url, params=None, session=None, **request_kwargs):
         """Query the STAC service using HTTP GET verb and return the result as a JSON document.
 
         :param url: The URL to query must be a valid STAC endpoint.
@@ -31,30 +59,112 @@ class Utils:
         :param params: (optional) Dictionary, list of tuples or bytes to send
             in the query string for the underlying `Requests`.
         :type params: dict
+        :param session: (optional) The HTTP session used to send the request. The GET
+            responses are cached when it has a ``cache``, see :class:`stac.cache.DiskCache`,
+            unless the request is sent with an ``auth`` handler.
+        :type session: requests.Session
 
         :rtype: dict
 
         :raises ValueError: If the response body does not contain a valid json.
         """
         response = None
+        http = session or requests
+
+        if Utils._search_method(params) == 'POST':
+            response = http.post(url, json=params, **request_kwargs)
+            return Utils._json(response)
+
+        cache = getattr(session, 'cache', None)
+        if request_kwargs.get('auth') is not None or getattr(session, 'auth', None) is not None:
+            # The credentials of an authentication handler are unknown, so they can not be part of the key.
+            cache = None
+
+        key, cached = None, None
+        if cache is not None:
+            key = cache.key(url, params, {**session.headers, **(request_kwargs.get('headers') or {})})
+            cached = cache.get(key)
+            if cached is not None and cached.fresh:
+                return cached.data
+            if cached is not None:
+                request_kwargs = dict(request_kwargs, headers={**(request_kwargs.get('headers') or {}),
+                                                               **cached.validators})
 
         if params is not None:
-            if 'intersects' in params or 'query' in params or 'filter' in params:
-                if 'collections' in params and isinstance(params['collections'], str):
-                    params['collections'] = params['collections'].split(',')
-                if 'ids' in params and isinstance(params['ids'], str):
-                    params['ids'] = params['ids'].split(',')
-                if 'bbox' in params and isinstance(params['bbox'], str):
-                    params['bbox'] = [float(coord) for coord in params['bbox'].split(',')]
-
-                response = requests.post(url, json=params, **request_kwargs)
-            else:
-                if 'collections' in params and type(params['collections']) in (tuple, list):
-                    params['collections'] = ','.join(params['collections'])
-                response = requests.get(url, params=params, **request_kwargs)
+            response = http.get(url, params=params, **request_kwargs)
         else:
-            response = requests.get(url, **request_kwargs)
+            response = http.get(url, **request_kwargs)
+
+        if cached is not None and response.status_code == 304:
+            cache.revalidate(key, response.headers)
+            return cached.data
+
+        data = Utils._json(response)
+
+        if cache is not None:
+            cache.set(key, url, data, response.headers)
+
+        return data
+
+    @staticmethod
+    def _search_method(params):
+        """Return the HTTP verb used to send the given query parameters.
+
+        Queries with ``intersects``, ``query`` or ``filter`` are sent as a JSON body using POST,
+        the other ones in the query string using GET. The parameters are normalized in place
+        to the representation expected by the chosen verb.
+
+        :param params: (optional) A dictionary with valid STAC query parameters.
+        :type params: dict
+
+        :rtype: str
+        """
+        if params is None:
+            return 'GET'
+
+        if 'intersects' in params or 'query' in params or 'filter' in params:
+            if 'collections' in params and isinstance(params['collections'], str):
+                params['collections'] = params['collections'].split(',')
+            if 'ids' in params and isinstance(params['ids'], str):
+                params['ids'] = params['ids'].split(',')
+            if 'bbox' in params and isinstance(params['bbox'], str):
+                params['bbox'] = [float(coord) for coord in params['bbox'].split(',')]
+            return 'POST'
+
+        if 'collections' in params and type(params['collections']) in (tuple, list):
+            params['collections'] = ','.join(params['collections'])
+        return 'GET'
+
+    @staticmethod
+    def _post(url, body=None, session=None, **request_kwargs):
+        """Query the STAC service using HTTP POST verb and return the result as a JSON document.
+
+        :param url: The URL to query must be a valid STAC endpoint.
+        :type url: str
+        :param body: (optional) Dictionary sent as the JSON body of the request.
+        :type body: dict
+        :param session: (optional) The HTTP session used to send the request.
+        :type session: requests.Session
+
+        :rtype: dict
+
+        :raises ValueError: If the response body does not contain a valid json.
+        """
+        response = (session or requests).post(url, json=body, **request_kwargs)
+
+        return Utils._json(response)
+
+    @staticmethod
+    def _json(response):
+        """Check the status of a STAC response and return its JSON document.
 
+        :param response: The HTTP response.
+        :type response: requests.Response
+
+        :rtype: dict
+
+        :raises ValueError: If the response body does not contain a valid json.
+        """
         response.raise_for_status()
 
         content_type = response.headers.get('content-type')
@@ -65,21 +175,79 @@ class Utils:
         return response.json()
 
     @staticmethod
-    def validate(stac_object):
+    @lru_cache(maxsize=None)
+    def schema(stac_version, object_type):
+        """Return a bundled STAC jsonschema.
+
+        Each jsonschema is loaded on first use and shared by all the STAC objects of the
+        same version and type. It must not be modified.
+
+        :param stac_version: The STAC version, e.g. '0.9.0'.
+        :type stac_version: str
+        :param object_type: The jsonschema name, e.g. 'catalog', 'collection' or 'item'.
+        :type object_type: str
+
+        :rtype: dict
+        """
+        with open(os.path.join(_resource_path('jsonschemas'), stac_version, f'{object_type}.json')) as schema_file:
+            return json.load(schema_file)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def validator(stac_version, object_type):
+        """Return the compiled jsonschema validator of a STAC object type.
+
+        The validator is built once per (stac_version, object_type) and reused. All the
+        bundled jsonschemas of the STAC version are preloaded in its resolver, so the local
+        references are never read again, and the remote ones are fetched only once.
+
+        :param stac_version: The STAC version, e.g. '0.9.0'.
+        :type stac_version: str
+        :param object_type: The jsonschema name: 'catalog', 'collection', 'item' or 'itemcollection'.
+        :type object_type: str
+
+        :rtype: jsonschema.protocols.Validator
+        """
+        from jsonschema import RefResolver, validators
+
+        schemas_path = os.path.join(_resource_path('jsonschemas'), stac_version)
+        base_uri = f'file://{schemas_path}/'
+
+        store = {f'{base_uri}{file_name}': Utils.schema(stac_version, file_name[:-len('.json')])
+                 for file_name in os.listdir(schemas_path) if file_name.endswith('.json')}
+
+        schema = Utils.schema(stac_version, object_type)
+
+        validator_class = validators.validator_for(schema)
+        validator_class.check_schema(schema)
+
+        return validator_class(schema, resolver=RefResolver(base_uri, schema, store=store))
+
+    @staticmethod
+    def validate(stac_object, object_type=None):
         """Validate a STAC Object using its jsonschema.
 
-        :param stac_object: A STAC object.
+        :param stac_object: A STAC object, or a compact view over its JSON document, see :mod:`stac.compact`.
+        :param object_type: (optional) The jsonschema name. Defaults to the lower-cased class name of the object.
+        :type object_type: str
 
         :raise ValidationError: raise a ValidationError if the STAC Object couldn't be validated.
         """
-        resolver = RefResolver(f'file://{base_schemas_path}{stac_object.stac_version}/', None)
+        from jsonschema.exceptions import best_match
+
+        validator = Utils.validator(stac_object.stac_version, object_type or type(stac_object).__name__.lower())
+
+        # The resolver keeps the current reference scope, so it can not be shared between threads at once.
+        with _validation_lock:
+            error = best_match(validator.iter_errors(getattr(stac_object, 'data', stac_object)))
 
-        validate(stac_object, stac_object.schema, resolver=resolver)
+        if error is not None:
+            raise error
 
     @staticmethod
     def render_html(template_name, **kwargs): # pragma: no cover
         """Render Jinja2 HTML template."""
-        template = templateEnv.get_template( template_name )
+        template = _template_env().get_template(template_name)
         return template.render(**kwargs)
 
     @staticmethod
@@ -121,11 +289,12 @@ class Utils:
         return f'{bounds[0]},{bounds[1]},{bounds[2]},{bounds[3]}'
 
     @staticmethod
-    def safe_request(url: str, method: str = 'get', **kwargs) -> requests.Response:
+    def safe_request(url: str, method: str = 'get', session=None, **kwargs) -> requests.Response:
         """Query the given URL for any HTTP Request and handle minimal HTTP Exceptions.
 
         :param url: The URL to query.
         :param method: HTTP Method name.
+        :param session: (optional) The HTTP session used to send the request.
         :param kwargs: (optional) Any argument supported by `requests.request <https://docs.python-requests.org/en/latest/api/#requests.request>`_
 
         :raise HTTPError - For any HTTP error related.
@@ -134,7 +303,7 @@ class Utils:
         :rtype: requests.Response
         """
         try:
-            response = requests.request(method, url, **kwargs)
+            response = (session or requests).request(method, url, **kwargs)
 
             response.raise_for_status()
 
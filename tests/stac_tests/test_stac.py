@@ -7,11 +7,18 @@
 #
 """Unit-test for STAC operations."""
 
+import asyncio
 import json
 import os
 import re
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
 from pathlib import Path
 
+import jsonschema
 import pytest
 import requests
 from click.testing import CliRunner
@@ -61,6 +68,79 @@ class TestUtils:
             stac.Utils._get(url)
 
 
+    def test_schema(self, stac_objects):
+        schema = stac.Utils.schema('0.9.0', 'item')
+        assert stac.Utils.schema('0.9.0', 'item') is schema
+
+        items = stac.ItemCollection(stac_objects['0.9.0']['items.json'])
+        assert items.features[0].schema is items.features[1].schema is schema
+        assert stac.Collection(stac_objects['0.9.0']['collection.json']).schema['title'] == 'STAC Collection Specification'
+
+    def test_lazy_imports(self):
+        heavy_modules = ('asyncio', 'click', 'jinja2', 'jsonschema', 'pkg_resources', 'pyarrow', 'rasterio')
+        code = 'import sys, stac; print(" ".join(m for m in sys.argv[1:] if m in sys.modules))'
+        output = subprocess.run([sys.executable, '-c', code, *heavy_modules], check=True,
+                                capture_output=True, text=True).stdout
+        assert output.split() == []
+
+    def test_base_schemas_path(self):
+        from stac import utils
+
+        assert utils.base_schemas_path.endswith(os.sep)
+        assert os.path.isdir(utils.base_schemas_path + '0.9.0')
+
+    def test_lazy_item_collection(self, stac_objects):
+        data = stac_objects['0.9.0']['items.json']
+        items = stac.ItemCollection(data, lazy=True)
+
+        assert isinstance(items.features, stac.item.ItemSequence)
+        assert items['features'] is data['features']
+        assert len(items.features) == 2
+        assert isinstance(items.features[0], stac.Item)
+        assert items.features[-1].id == 'feature2'
+        assert [item.id for item in items.features[1:]] == ['feature2']
+        assert [item.id for item in items] == ['feature1', 'feature2']
+        assert len(stac.ItemCollection({}, lazy=True).features) == 0
+
+    def test_compact_item(self, stac_objects):
+        data = stac_objects['0.7.0']['items.json']
+        items = stac.ItemCollection(data, validate=True, compact=True)
+        item = items.features[0]
+
+        assert isinstance(item, stac.CompactItem)
+        assert not hasattr(item, '__dict__')
+        assert item.data is data['features'][0]
+        assert item['id'] == item.id == 'feature1'
+        assert item.geometry.type == data['features'][0]['geometry']['type']
+        assert item.properties.datetime == data['features'][0]['properties']['datetime']
+        assert set(item.assets) == set(data['features'][0]['assets'])
+        assert dict(item) == data['features'][0]
+        assert isinstance(item.to_item(), stac.Item)
+        assert [i.id for i in stac.ItemCollection(data, lazy=True, compact=True)] == ['feature1', 'feature2']
+
+    def test_cached_wrappers(self, stac_objects):
+        item = stac.Item(stac_objects['0.9.0']['items.json']['features'][0])
+        assert item.geometry is item.geometry
+        assert item.properties is item.properties
+        assert item.properties.providers is item.properties.providers
+
+        collection = stac.Collection(stac_objects['0.9.0']['collection.json'])
+        assert collection.extent is collection.extent
+        assert collection.extent.spatial is collection.extent.spatial
+        assert collection.extent.temporal is collection.extent.temporal
+
+    def test_validator(self, stac_objects):
+        validator = stac.Utils.validator('0.7.0', 'item')
+        assert stac.Utils.validator('0.7.0', 'item') is validator
+
+        items = stac.ItemCollection(stac_objects['0.7.0']['items.json'], validate=True)
+        assert len(items.features) == 2
+
+        feature = dict(stac_objects['0.7.0']['items.json']['features'][0])
+        del feature['assets']
+        with pytest.raises(jsonschema.ValidationError):
+            stac.Item(feature, validate=True)
+
 
 class TestStac:
     def test_stac(self):
@@ -69,6 +149,87 @@ class TestStac:
         assert repr(s) == f'stac("{url}")'
         assert str(s) == f'<STAC [{url}]>'
 
+    def test_session(self, stac_objects, requests_mock):
+        s = stac.STAC(url, pool_size=4, max_retries=2, keep_alive=False)
+        assert isinstance(s.session, stac.Session)
+        assert s.session.get_adapter(url).max_retries.total == 2
+        assert s.session.headers['Connection'] == 'close'
+
+        requests_mock.get(match_url, json=stac_objects['0.9.0']['collection.json'],
+                          status_code=200,
+                          headers={'content-type':'application/json'})
+        collection = s.collection('my_collection1')
+        assert collection._session is s.session
+
+        requests_mock.get(match_url, json=stac_objects['0.9.0']['items.json'],
+                          status_code=200,
+                          headers={'content-type':'application/json'})
+        item = collection.get_items().features[0]
+        assert item._session is s.session
+        assert item.assets['thumbnail']._session is s.session
+
+        session = requests.Session()
+        with stac.STAC(url, session=session) as s:
+            assert s.session is session
+
+    def test_retry(self, stac_objects, requests_mock, monkeypatch):
+        delays = []
+        monkeypatch.setattr(stac.session.time, 'sleep', delays.append)
+
+        s = stac.STAC(url, retry=stac.RetryPolicy(max_attempts=3, backoff_factor=1, jitter=False))
+        requests_mock.get(match_url, [
+            {'status_code': 503},
+            {'status_code': 429, 'headers': {'retry-after': '7'}},
+            {'json': stac_objects['0.9.0']['collection.json'], 'headers': {'content-type': 'application/json'}},
+        ])
+        assert s.collection('my_collection1').id == 'my_collection1'
+        assert delays == [1, 7]
+        assert s.session.metrics == {'requests': 3, 'retries': 2}
+
+        requests_mock.get(match_url, status_code=503)
+        with pytest.raises(KeyError):
+            stac.STAC(url, retry=2).collection('other')
+        assert len(delays) == 3 and 0 <= delays[2] <= 0.5
+
+        requests_mock.get(match_url, status_code=500)
+        s.session.metrics.reset()
+        with pytest.raises(KeyError):
+            s.collection('other')
+        assert s.session.metrics == {'requests': 1, 'retries': 0}
+
+    def test_rate_limiter(self, stac_objects, requests_mock, monkeypatch):
+        delays = []
+        monkeypatch.setattr(stac.session.time, 'sleep', delays.append)
+        monkeypatch.setattr(stac.session.time, 'monotonic', lambda: 0)
+
+        limiter = stac.RateLimiter(rate=10, burst=2, max_in_flight=1)
+        s = stac.STAC(url, rate_limiter=limiter)
+        assert s.session.rate_limiter is limiter
+
+        requests_mock.get(match_url, json=stac_objects['0.9.0']['collection.json'],
+                          headers={'content-type': 'application/json'})
+        for collection_id in ('a', 'b', 'c'):
+            s.collection(collection_id)
+        with limiter.limit('http://other.example.com/stac'):
+            pass
+        assert delays == [pytest.approx(0.1)]
+
+        monkeypatch.undo()
+        limiter = stac.RateLimiter(max_in_flight=1)
+        in_flight = []
+
+        async def request(name):
+            async with limiter.limit_async('http://async.example.com/stac'):
+                in_flight.append(name)
+                assert len(in_flight) == 1
+                await asyncio.sleep(0)
+                in_flight.remove(name)
+
+        async def requests():
+            await asyncio.gather(request('a'), request('b'))
+
+        asyncio.run(requests())
+
     def test_catalog(self, stac_objects, requests_mock):
         for k in stac_objects:
             s = stac.STAC(url + "/stac" if k != '0.9.0' else url, True)
@@ -353,6 +514,739 @@ class TestStac:
             assert str(err.value) == "(None) You don't have permission to request this resource."
 
 
+class TestPagination:
+    @staticmethod
+    def _page(stac_objects, ids, next_link=None):
+        page = dict(stac_objects['0.9.0']['items.json'])
+        page['features'] = [dict(page['features'][0], id=i) for i in ids]
+        page['links'] = [next_link] if next_link else []
+        return page
+
+    @staticmethod
+    def _join_prefetch():
+        """Wait for the prefetch threads left running by the closed searches."""
+        for thread in threading.enumerate():
+            if thread.name == 'stac-prefetch':
+                thread.join()
+
+    def test_search_iter_get(self, stac_objects, requests_mock):
+        s = stac.STAC(url)
+        s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+
+        requests_mock.get(url + '/search?limit=2', json=self._page(stac_objects, ['a', 'b'], {
+            'rel': 'next', 'href': url + '/search?limit=2&page=2'
+        }), headers={'content-type':'application/json'})
+        requests_mock.get(url + '/search?limit=2&page=2', json=self._page(stac_objects, ['c']),
+                          headers={'content-type':'application/json'})
+
+        items = s.search_iter(limit=2)
+        assert requests_mock.call_count == 0
+        assert [item.id for item in items] == ['a', 'b', 'c']
+        assert [item.id for item in s.search_iter(max_items=2, limit=2)] == ['a', 'b']
+
+        items = list(s.search_iter(compact=True, limit=2))
+        assert all(isinstance(item, stac.CompactItem) for item in items)
+        assert [item.id for item in items] == ['a', 'b', 'c']
+
+    def test_search_iter_post(self, stac_objects, requests_mock):
+        s = stac.STAC(url)
+        s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+
+        def callback(request, context):
+            body = request.json()
+            if body.get('token') is None:
+                return self._page(stac_objects, ['a'], {
+                    'rel': 'next', 'href': url + '/search', 'method': 'POST',
+                    'body': {'token': 'next'}, 'merge': True
+                })
+            assert body['query'] == {'eo:cloud_cover': {'lt': 10}}
+            return self._page(stac_objects, ['b'])
+
+        requests_mock.post(url + '/search', json=callback, headers={'content-type':'application/json'})
+
+        items = list(s.search_iter(query={'eo:cloud_cover': {'lt': 10}}))
+        assert [item.id for item in items] == ['a', 'b']
+
+    def test_search_iter_prefetch(self, stac_objects, requests_mock):
+        s = stac.STAC(url)
+        s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+
+        def callback(request, context):
+            page = int(request.qs.get('page', ['1'])[0])
+            next_link = {'rel': 'next', 'href': f'{url}/search?page={page + 1}'} if page < 5 else None
+            return self._page(stac_objects, [f'item{page}'], next_link)
+
+        requests_mock.get(re.compile(url + '/search'), json=callback, headers={'content-type':'application/json'})
+
+        items = s.search_iter(prefetch=2)
+        assert [item.id for item in items] == [f'item{i}' for i in range(1, 6)]
+
+        assert [item.id for item in s.search_iter(max_items=1, prefetch=2)] == ['item1']
+
+        requests_mock.get(re.compile(url + '/search'), status_code=500)
+        with pytest.raises(requests.exceptions.HTTPError):
+            list(s.search_iter(prefetch=1))
+        self._join_prefetch()
+
+    def test_search_iter_prefetch_close(self, stac_objects, requests_mock):
+        s = stac.STAC(url)
+        s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+        release = threading.Event()
+
+        def callback(request, context):
+            page = int(request.qs.get('page', ['1'])[0])
+            if page > 1:
+                release.wait(5)
+            return self._page(stac_objects, [f'item{page}'], {'rel': 'next', 'href': f'{url}/search?page={page + 1}'})
+
+        requests_mock.get(re.compile(url + '/search'), json=callback, headers={'content-type':'application/json'})
+
+        items = s.search_iter(prefetch=1)
+        assert next(items).id == 'item1'
+        start = time.monotonic()
+        items.close()
+        assert time.monotonic() - start < 1
+        release.set()
+        self._join_prefetch()
+
+    def test_iter_items_page(self, stac_objects, requests_mock):
+        collection = stac.Collection(stac_objects['0.7.0']['collection.json'])
+        items_url = [link['href'] for link in collection['links'] if link['rel'] == 'items'][0]
+
+        pages = {'1': ['a', 'b'], '2': ['c', 'd'], '3': ['e']}
+        requests_mock.get(items_url, json=lambda request, context: self._page(stac_objects, pages[request.qs['page'][0]]),
+                          headers={'content-type':'application/json'})
+
+        items = collection.iter_items(filter={'limit': 2, 'page': 1})
+        assert [item.id for item in items] == ['a', 'b', 'c', 'd', 'e']
+        assert requests_mock.call_count == 3
+
+    def test_iter_items_page_ignored(self, stac_objects, requests_mock):
+        for version, calls in (('0.7.0', 2), ('0.9.0', 1)):
+            requests_mock.reset_mock()
+            collection = stac.Collection(stac_objects[version]['collection.json'])
+            items_url = [link['href'] for link in collection['links'] if link['rel'] == 'items'][0]
+            requests_mock.get(items_url, json=self._page(stac_objects, ['a', 'b']),
+                              headers={'content-type':'application/json'})
+
+            items = collection.iter_items(filter={'limit': 2, 'page': 1})
+            assert [item.id for item in items] == ['a', 'b']
+            assert requests_mock.call_count == calls
+
+    def test_federated_search(self, stac_objects, requests_mock, monkeypatch):
+        mirror, slow = 'http://mirror.example.com/stac', 'http://slow.example.com/stac'
+        clients = []
+        for endpoint in (url, mirror, slow):
+            s = stac.STAC(endpoint)
+            s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+            clients.append(s)
+
+        def slow_search(**query):
+            time.sleep(1)
+            yield from stac.ItemCollection(self._page(stac_objects, ['z']))['features']
+
+        requests_mock.get(url + '/search', json=self._page(stac_objects, ['a', 'b']),
+                          headers={'content-type':'application/json'})
+        requests_mock.get(mirror + '/search', json=self._page(stac_objects, ['b', 'c']),
+                          headers={'content-type':'application/json'})
+        monkeypatch.setattr(clients[2], 'search_iter', slow_search)
+
+        federated = stac.FederatedSTAC(clients, timeout=0.5)
+        assert sorted(item.id for item in federated.search()) == ['a', 'b', 'c']
+        assert list(federated.errors) == [slow]
+        assert isinstance(federated.errors[slow], TimeoutError)
+
+        assert len(list(federated.search(max_items=1))) == 1
+
+    def test_split_query(self):
+        queries = stac.federation.split_query({'bbox': '0,0,2,4', 'datetime': '2020-01-01/2020-01-03', 'limit': 10},
+                                              tiles=(2, 1), periods=2)
+        assert [(q['bbox'], q['datetime']) for q in queries] == [
+            ('0.0,0.0,1.0,4.0', '2020-01-01/2020-01-02T00:00:00Z'),
+            ('0.0,0.0,1.0,4.0', '2020-01-02T00:00:00Z/2020-01-03'),
+            ('1.0,0.0,2.0,4.0', '2020-01-01/2020-01-02T00:00:00Z'),
+            ('1.0,0.0,2.0,4.0', '2020-01-02T00:00:00Z/2020-01-03'),
+        ]
+        assert all(q['limit'] == 10 for q in queries)
+        assert stac.federation.split_datetime('2020-01-01/..', 4) == ['2020-01-01/..']
+
+    def test_search_iter_split(self, stac_objects, requests_mock):
+        s = stac.STAC(url)
+        s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+
+        def callback(request, context):
+            xmin = float(request.qs['bbox'][0].split(',')[0])
+            # The Item 'edge' lies on the tiles edge.
+            return self._page(stac_objects, ['left' if xmin < 1 else 'right', 'edge'])
+
+        requests_mock.get(re.compile(url + '/search'), json=callback, headers={'content-type':'application/json'})
+
+        items = s.search_iter(tiles=(2, 1), bbox=[0, 0, 2, 1])
+        assert sorted(item.id for item in items) == ['edge', 'left', 'right']
+        assert requests_mock.call_count == 2
+
+    def test_merge_searches_workers(self):
+        from stac.federation import merge_searches
+
+        lock, running, peak = threading.Lock(), [0], [0]
+
+        def search(name):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            return [{'collection': 'c', 'id': name}]
+
+        searches = {f'{index}': (lambda index=index: search(index)) for index in range(12)}
+        items = list(merge_searches(searches, workers=3))
+        assert sorted(item['id'] for item in items) == list(range(12))
+        assert peak[0] <= 3
+
+    def test_get_items_many(self, stac_objects, requests_mock):
+        s = stac.STAC(url)
+        s._catalog = stac.Catalog(dict(stac_objects['0.9.0']['catalog.json'],
+                                       conformsTo=['https://api.stacspec.org/v1.0.0/item-search']))
+        requests_mock.get(url + '/collections/my_collection1', json=stac_objects['0.9.0']['collection.json'],
+                          headers={'content-type':'application/json'})
+
+        def search(request, context):
+            assert request.qs['collections'] == ['my_collection1']
+            ids = request.qs['ids'][0].split(',')
+            return self._page(stac_objects, [i for i in ids if i != 'missing'])
+
+        requests_mock.get(re.compile(url + '/search'), json=search, headers={'content-type':'application/json'})
+
+        results = s.get_items('my_collection1', ['b', 'a', 'missing', 'b'], batch_size=2)
+        assert [result.id for result in results] == ['b', 'a', 'missing', 'b']
+        assert [result.item.id for result in results if result.item] == ['b', 'a', 'b']
+        assert isinstance(results[2].error, KeyError)
+        assert requests_mock.call_count == 3
+
+        s._catalog = stac.Catalog(stac_objects['0.9.0']['catalog.json'])
+        feature = stac_objects['0.9.0']['items.json']['features'][0]
+        requests_mock.get(url + '/collections/my_collection1/items/a', json=dict(feature, id='a'),
+                          headers={'content-type':'application/json'})
+        requests_mock.get(url + '/collections/my_collection1/items/missing', status_code=404)
+
+        results = s.get_items('my_collection1', ['missing', 'a'])
+        assert results[0].item is None and isinstance(results[0].error, requests.exceptions.HTTPError)
+        assert results[1].item.id == 'a' and results[1].error is None
+
+        def crawl(request, context):
+            page = int(request.qs.get('page', ['1'])[0])
+            return self._page(stac_objects, [f'x{page}', f'y{page}'],
+                              {'rel': 'next', 'href': f'{url}/search?page={page + 1}'})
+
+        requests_mock.get(re.compile(url + '/search'), json=crawl, headers={'content-type':'application/json'})
+        requests_mock.reset_mock()
+
+        collection = s.collection('my_collection1')
+        results = collection.get_items_many(['a'], search_url=url + '/search')
+        assert results[0].item.id == 'a'
+        assert len([r for r in requests_mock.request_history if r.path == '/search']) == 1
+
+        requests_mock.get(re.compile(url + '/search'), exc=requests.exceptions.ConnectTimeout)
+        requests_mock.reset_mock()
+
+        results = collection.get_items_many(['a', 'missing'], search_url=url + '/search')
+        assert results[0].item.id == 'a' and results[0].error is None
+        assert isinstance(results[1].error, requests.exceptions.HTTPError)
+
+class TestCache:
+    def test_disk_cache(self, stac_objects, requests_mock, tmp_path):
+        cache = stac.cache.DiskCache(str(tmp_path / 'cache.sqlite'))
+        collections = dict(collections=[stac_objects['0.9.0']['collection.json']])
+
+        requests_mock.get(url + '/collections', json=collections,
+                          headers={'content-type': 'application/json', 'cache-control': 'max-age=60'})
+        assert 'my_collection1' in stac.STAC(url, cache=cache).collections
+        assert 'my_collection1' in stac.STAC(url, cache=cache).collections
+        assert requests_mock.call_count == 1
+
+        # A new process sees the same entries.
+        assert len(stac.cache.DiskCache(cache.path)) == 1
+
+        def not_modified(request, context):
+            if request.headers.get('If-None-Match') == '"v1"':
+                context.status_code = 304
+                return None
+            return stac_objects['0.9.0']['collection.json']
+
+        requests_mock.reset_mock()
+        requests_mock.get(url + '/collections/my_collection1', json=not_modified,
+                          headers={'content-type': 'application/json', 'etag': '"v1"'})
+        assert stac.STAC(url, cache=cache).collection('my_collection1').id == 'my_collection1'
+        assert stac.STAC(url, cache=cache).collection('my_collection1').id == 'my_collection1'
+        assert [request.headers.get('If-None-Match') for request in requests_mock.request_history] == [None, '"v1"']
+
+        requests_mock.get(url + '/conformance', json={'conformsTo': []},
+                          headers={'content-type': 'application/json', 'cache-control': 'no-store, max-age=60'})
+        stac.STAC(url, cache=cache).conformance
+        assert len(cache) == 2
+
+    def test_disk_cache_credentials(self, requests_mock, tmp_path):
+        session = stac.Session(cache=stac.cache.DiskCache(str(tmp_path / 'cache.sqlite')))
+        requests_mock.get(url + '/private', json=lambda request, context: {'key': request.headers.get('x-api-key')},
+                          headers={'content-type': 'application/json', 'cache-control': 'max-age=60'})
+
+        for key in ('a', 'b', 'a'):
+            assert stac.Utils._get(url + '/private', session=session, headers={'X-API-Key': key}) == {'key': key}
+        assert requests_mock.call_count == 2
+
+        stac.Utils._get(url + '/private', session=session, auth=('user', 'password'))
+        stac.Utils._get(url + '/private', session=session, auth=('user', 'password'))
+        assert requests_mock.call_count == 4
+
+    def test_disk_cache_eviction(self, tmp_path):
+        cache = stac.cache.DiskCache(str(tmp_path / 'cache.sqlite'), max_size=50)
+        headers = {'cache-control': 'max-age=60'}
+
+        for i in range(3):
+            cache.set(cache.key(f'{url}/{i}'), f'{url}/{i}', {'value': 'x' * 10}, headers)
+            cache.get(cache.key(f'{url}/0'))
+
+        assert cache.get(cache.key(f'{url}/0')).fresh
+        assert cache.get(cache.key(f'{url}/1')) is None
+        assert cache.get(cache.key(f'{url}/2')).data == {'value': 'x' * 10}
+
+    def test_memory_cache(self, monkeypatch):
+        now = [0]
+        monkeypatch.setattr(stac.cache.time, 'monotonic', lambda: now[0])
+
+        cache = stac.MemoryCache(max_entries=2, ttl=10)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        now[0] = 10
+        assert cache.get('a') is None
+        assert len(cache) == 1
+
+    def test_stac_memory_cache(self, stac_objects, requests_mock, monkeypatch):
+        now = [0]
+        monkeypatch.setattr(stac.cache.time, 'monotonic', lambda: now[0])
+
+        s = stac.STAC(url)
+        collection_data = stac_objects['0.9.0']['collection.json']
+        requests_mock.get(url + '/collections', json=dict(collections=[collection_data]),
+                          headers={'content-type': 'application/json'})
+
+        collection = s.collections['my_collection1']
+        assert s.collections['my_collection1'] is collection
+        assert s.collection('my_collection1') is collection
+        assert requests_mock.call_count == 1
+
+        now[0] = stac.cache.MEMORY_CACHE_TTL + 1
+        assert s.collections['my_collection1'] is collection
+        assert requests_mock.call_count == 2
+
+        item_data = stac_objects['0.9.0']['items.json']['features'][0]
+        requests_mock.get(re.compile(url + '/collections/my_collection1/items/'), json=item_data,
+                          headers={'content-type': 'application/json'})
+        item = collection.get_items(item_id='feature1')
+        assert collection.get_items(item_id='feature1') is item
+        assert requests_mock.call_count == 3
+        assert s.memory_cache.hits == 3
+
+
+class TestDownload:
+    @staticmethod
+    def _items(stac_objects):
+        page = dict(stac_objects['0.9.0']['items.json'])
+        page['features'] = [
+            dict(page['features'][0], id=f'item{i}', assets={
+                'red': {'href': f'{url}/data/item{i}_red.tif'},
+                'nir': {'href': f'{url}/data/item{i}_nir.tif'},
+            })
+            for i in range(3)
+        ]
+        return stac.ItemCollection(page)
+
+    content = b'0123456789'
+
+    def _mock(self, requests_mock, etag='"v1"'):
+        def callback(request, context):
+            if 'Range' not in request.headers:
+                return self.content
+            context.status_code = 206
+            start, end = request.headers['Range'][len('bytes='):].split('-')
+            return self.content[int(start):int(end) + 1 if end else None]
+
+        requests_mock.head(re.compile(url + '/data/'),
+                           headers={'content-length': str(len(self.content)), 'accept-ranges': 'bytes', 'etag': etag})
+        requests_mock.get(re.compile(url + '/data/'), content=callback)
+
+    def test_download_manager(self, stac_objects, requests_mock, tmp_path):
+        items = self._items(stac_objects)
+        self._mock(requests_mock)
+        requests_mock.head(url + '/data/item2_nir.tif', status_code=404)
+        requests_mock.get(url + '/data/item2_nir.tif', status_code=404)
+
+        summary = items.download(dir=str(tmp_path), workers=4, per_host=2, progress=False)
+
+        assert len(summary) == 6
+        assert len(summary.succeeded) == 5
+        assert [(r.item, r.asset) for r in summary.failed] == [('item2', 'nir')]
+        assert isinstance(summary.failed[0].error, requests.exceptions.HTTPError)
+        assert (tmp_path / 'item0' / 'item0_red.tif').read_bytes() == b'0123456789'
+
+        summary = items.download(dir=str(tmp_path), assets=['red'], progress=False)
+        assert [r.asset for r in summary] == ['red'] * 3
+
+    def test_download_same_names(self, stac_objects, requests_mock, tmp_path):
+        from stac.download import DownloadManager
+
+        items = self._items(stac_objects)
+        for i, item in enumerate(items['features']):
+            item['assets'] = {'red': {'href': f'{url}/data/scene{i}/B04.tif'}}
+        self._mock(requests_mock)
+
+        summary = DownloadManager(progress=False).download(items, dir=str(tmp_path))
+        assert [r.path for r in summary] == [str(tmp_path / f'item{i}' / 'B04.tif') for i in range(3)]
+
+        summary = DownloadManager(progress=False, item_dirs=False).download(items, dir=str(tmp_path))
+        assert [r.path for r in summary] == [str(tmp_path / 'B04.tif'), None, None]
+        assert all(isinstance(r.error, FileExistsError) for r in summary.failed)
+
+    def test_download_per_host(self, monkeypatch):
+        from stac.download import DownloadManager, DownloadResult
+
+        lock, running, peaks = threading.Lock(), Counter(), Counter()
+
+        def download(item_id, asset_key, asset, dir, progress):
+            host = asset['href'].split('/')[2]
+            with lock:
+                running[host] += 1
+                peaks[host] = max(peaks[host], running[host])
+                peaks['total'] = max(peaks['total'], sum(running.values()))
+            time.sleep(0.02)
+            with lock:
+                running[host] -= 1
+            return DownloadResult(item_id, asset_key, asset['href'], None, None)
+
+        manager = DownloadManager(workers=4, per_host=2, progress=False)
+        monkeypatch.setattr(manager, '_download', download)
+        items = [{'id': f'{host}{i}', 'assets': {'data': {'href': f'http://{host}/{i}.tif'}}}
+                 for host in ('a', 'b') for i in range(4)]
+
+        summary = manager.download(items)
+        assert [result.item for result in summary] == [item['id'] for item in items]
+        assert peaks['a'] == peaks['b'] == 2 and peaks['total'] == 4
+
+        def features():
+            for item in items:
+                consumed.append(item['id'])
+                yield item
+
+        consumed = []
+        manager = DownloadManager(workers=1, per_host=1, progress=False, queue_size=2)
+        monkeypatch.setattr(manager, '_download', download)
+        results = manager.iter_download(features())
+        assert next(results).item == 'a0'
+        assert len(consumed) <= 3
+        assert [result.item for result in results] == [item['id'] for item in items[1:]]
+
+    def test_item_download(self, stac_objects, requests_mock, tmp_path):
+        item = self._items(stac_objects).features[0]
+        self._mock(requests_mock)
+
+        output = item.download(dir=str(tmp_path), workers=2)
+        assert output == {'red': str(tmp_path / 'item0_red.tif'), 'nir': str(tmp_path / 'item0_nir.tif')}
+        assert item.download(dir=str(tmp_path), assets=['nir']) == {'nir': str(tmp_path / 'item0_nir.tif')}
+
+
+    def test_download_resume(self, stac_objects, requests_mock, tmp_path):
+        asset = self._items(stac_objects).features[0].assets['red']
+        self._mock(requests_mock)
+
+        filename = tmp_path / 'item0_red.tif'
+        part = tmp_path / stac.download._part_filename('item0_red.tif', '"v1"')
+        part.write_bytes(self.content[:4])
+
+        assert asset.download(dir=str(tmp_path)) == str(filename)
+        assert filename.read_bytes() == self.content
+        assert not part.exists()
+        assert requests_mock.last_request.headers['Range'] == 'bytes=4-'
+        assert requests_mock.last_request.headers['If-Range'] == '"v1"'
+
+        # The file on disk has the remote size: it is not downloaded again.
+        requests_mock.reset_mock()
+        asset.download(dir=str(tmp_path))
+        assert [request.method for request in requests_mock.request_history] == ['HEAD']
+
+        # A partial file of a previous version of the remote file is not resumed.
+        self._mock(requests_mock, etag='"v2"')
+        part.write_bytes(b'xxxx')
+        asset.download(dir=str(tmp_path), overwrite=True)
+        assert 'Range' not in requests_mock.last_request.headers
+        assert filename.read_bytes() == self.content
+
+        # A remote file changed without changing its size is downloaded again, once.
+        self._mock(requests_mock, etag='"v3"')
+        requests_mock.reset_mock()
+        asset.download(dir=str(tmp_path))
+        assert [request.method for request in requests_mock.request_history] == ['HEAD', 'GET']
+        requests_mock.reset_mock()
+        asset.download(dir=str(tmp_path))
+        assert [request.method for request in requests_mock.request_history] == ['HEAD']
+
+    def test_download_segments(self, stac_objects, requests_mock, tmp_path):
+        asset = self._items(stac_objects).features[0].assets['red']
+        self._mock(requests_mock)
+
+        filename = asset.download(dir=str(tmp_path), chunk_size=2, segments=3)
+        assert open(filename, 'rb').read() == self.content
+
+        ranges = sorted(request.headers['Range'] for request in requests_mock.request_history if request.method == 'GET')
+        assert ranges == ['bytes=0-3', 'bytes=4-7', 'bytes=8-9']
+        assert sorted(os.listdir(tmp_path)) == ['.item0_red.tif.validator', 'item0_red.tif']
+
+    def test_download_segments_resume(self, stac_objects, requests_mock, tmp_path):
+        asset = self._items(stac_objects).features[0].assets['red']
+        self._mock(requests_mock)
+        part = stac.download._part_filename(str(tmp_path / 'item0_red.tif'), '"v1"')
+        # A partial segment of the same bounds and one of a run with other segments.
+        open(f'{part}.0-3', 'wb').write(b'01')
+        open(f'{part}.0-4', 'wb').write(b'xxxxx')
+
+        filename = asset.download(dir=str(tmp_path), chunk_size=2, segments=3)
+        assert open(filename, 'rb').read() == self.content
+
+        ranges = sorted(request.headers['Range'] for request in requests_mock.request_history if request.method == 'GET')
+        assert ranges == ['bytes=2-3', 'bytes=4-7', 'bytes=8-9']
+        assert sorted(os.listdir(tmp_path)) == ['.item0_red.tif.validator', 'item0_red.tif']
+
+
+class TestExport:
+    def test_to_arrow(self, stac_objects):
+        pytest.importorskip('pyarrow')
+        from shapely import wkb
+
+        items = stac.ItemCollection(stac_objects['0.9.0']['items.json'])
+        table = items.to_arrow()
+
+        assert table.num_rows == 2
+        assert table.column('id').to_pylist() == ['feature1', 'feature2']
+        assert table.column('bbox_xmin').to_pylist()[0] == items.features[0].bbox[0]
+        assert str(table.schema.field('datetime').type) == 'timestamp[us, tz=UTC]'
+        assert table.column('assets.thumbnail.href').to_pylist()[0] == items.features[0].assets['thumbnail'].href
+        assert wkb.loads(table.column('geometry')[0].as_py()).geom_type == items.features[0].geometry.type
+
+    def test_to_pandas(self, stac_objects):
+        pytest.importorskip('pandas')
+        pytest.importorskip('pyarrow')
+
+        df = stac.ItemCollection(stac_objects['0.9.0']['items.json']).to_pandas()
+        assert list(df['id']) == ['feature1', 'feature2']
+
+    def test_write_geoparquet(self, stac_objects, tmp_path):
+        pytest.importorskip('pyarrow')
+        import pyarrow.parquet as pq
+
+        from stac.export import write_geoparquet
+
+        page = stac.ItemCollection(stac_objects['0.9.0']['items.json'])
+        path = str(tmp_path / 'items.parquet')
+
+        assert write_geoparquet([page, page], path) == 4
+        table = pq.read_table(path)
+        assert table.num_rows == 4
+        assert json.loads(table.schema.metadata[b'geo'])['primary_column'] == 'geometry'
+
+        assert write_geoparquet(iter(page.features * 3), path, batch_size=4) == 6
+        assert pq.read_table(path).num_rows == 6
+
+    def test_write_geoparquet_types(self, stac_objects, tmp_path):
+        pytest.importorskip('pyarrow')
+        import pyarrow.parquet as pq
+
+        from stac.export import write_geoparquet
+
+        feature = stac_objects['0.9.0']['items.json']['features'][0]
+
+        def page(*properties):
+            return stac.ItemCollection({'features': [
+                dict(feature, id=f'{index}', properties=dict(p)) for index, p in enumerate(properties)
+            ]})
+
+        pages = [
+            page({'eo:cloud_cover': 10, 'datetime': None, 'count': 1, 'empty': None}),
+            page({'eo:cloud_cover': 12.5, 'datetime': '2020-01-01T00:00:00Z', 'count': 2.5, 'tag': [1]}),
+            page({'tag': 'a', 'empty': 3}),
+        ]
+        path = str(tmp_path / 'items.parquet')
+
+        assert write_geoparquet(pages, path) == 3
+        table = pq.read_table(path)
+        types = {field.name: str(field.type) for field in table.schema}
+        assert types['eo:cloud_cover'] == types['count'] == types['empty'] == 'double'
+        assert types['datetime'] == 'timestamp[us, tz=UTC]'
+        assert types['tag'] == 'string'
+        assert table.column('eo:cloud_cover').to_pylist() == [10.0, 12.5, None]
+        assert table.column('tag').to_pylist() == [None, '[1]', 'a']
+        assert table.column('empty').to_pylist() == [None, None, 3.0]
+
+
+class TestRaster:
+    @staticmethod
+    def _raster(path, size, value, dtype='uint8'):
+        import numpy
+        import rasterio
+        from rasterio.transform import from_bounds
+
+        with rasterio.open(path, 'w', driver='GTiff', width=size, height=size, count=1, dtype=dtype,
+                           crs='EPSG:4326', transform=from_bounds(0, 0, 1, 1, size, size)) as dataset:
+            dataset.write(numpy.full((size, size), value, dtype=dtype), 1)
+        return str(path)
+
+    def test_read_bands(self, stac_objects, tmp_path):
+        from rasterio.windows import Window
+
+        item = stac.Item(dict(stac_objects['0.9.0']['items.json']['features'][0], assets={
+            'red': {'href': self._raster(tmp_path / 'red.tif', 10, 1)},
+            'nir': {'href': self._raster(tmp_path / 'nir.tif', 20, 2)},
+        }))
+
+        bands = item.read_bands(['red', 'nir'], bbox=[0, 0, 0.5, 0.5])
+        assert bands.shape == (2, 5, 5)
+        assert (bands[0] == 1).all() and (bands[1] == 2).all()
+
+        bands = item.read_bands(['nir', 'red'], window=Window(0, 0, 4, 4), out_shape=(2, 2))
+        assert bands.shape == (2, 2, 2)
+
+    def test_build_cube(self, stac_objects, tmp_path):
+        feature = stac_objects['0.9.0']['items.json']['features'][0]
+        items = stac.ItemCollection(dict(stac_objects['0.9.0']['items.json'], features=[
+            dict(feature, id=f'item{day}', properties=dict(feature['properties'], datetime=f'2020-01-0{day}T00:00:00Z'),
+                 assets={'red': {'href': self._raster(tmp_path / f'red{day}.tif', 10, day)},
+                         'nir': {'href': self._raster(tmp_path / f'nir{day}.tif', 20, 10 + day)}})
+            for day in (2, 1)
+        ]))
+
+        cube, times = items.to_cube(['red', 'nir'], [0, 0, 0.5, 0.5], path=str(tmp_path / 'cube.npy'))
+        assert cube.shape == (2, 2, 5, 5)
+        assert times == ['2020-01-01T00:00:00Z', '2020-01-02T00:00:00Z']
+        assert cube[0, 0].tolist() == [[1] * 5] * 5
+        assert (cube[1, 1] == 12).all()
+
+    def test_build_cube_dtypes(self, stac_objects, tmp_path):
+        feature = stac_objects['0.9.0']['items.json']['features'][0]
+        items = [dict(feature, assets={'red': {'href': self._raster(tmp_path / 'red.tif', 10, 1000, 'uint16')},
+                                       'qa': {'href': self._raster(tmp_path / 'qa.tif', 10, 3)}})]
+
+        from stac.datacube import build_cube
+
+        cube, _ = build_cube(items, ['red', 'qa'], [0, 0, 0.5, 0.5])
+        assert cube.dtype == 'uint16'
+        assert (cube[0, 0] == 1000).all() and (cube[0, 1] == 3).all()
+
+        cube, _ = build_cube(items, ['qa', 'red'], [0, 0, 0.5, 0.5], dtype='float32')
+        assert cube.dtype == 'float32'
+        assert (cube[0, 0] == 3).all() and (cube[0, 1] == 1000).all()
+
+    def test_build_cube_partial_coverage(self, stac_objects, tmp_path):
+        feature = stac_objects['0.9.0']['items.json']['features'][0]
+        items = [dict(feature, assets={'red': {'href': self._raster(tmp_path / 'red.tif', 10, 7)}})]
+
+        from stac.datacube import build_cube
+
+        cube, _ = build_cube(items, ['red'], [0.8, 0.8, 1.2, 1.2], fill_value=255)
+        assert cube.shape == (1, 1, 4, 4)
+        assert cube[0, 0].tolist() == [[255] * 4] * 2 + [[7, 7, 255, 255]] * 2
+
+    def test_cog_env(self):
+        rasterio = pytest.importorskip('rasterio')
+        from stac.raster import cog_env
+
+        with cog_env():
+            assert rasterio.env.getenv()['GDAL_DISABLE_READDIR_ON_OPEN'] == 'EMPTY_DIR'
+            assert 'CPL_VSIL_CURL_ALLOWED_EXTENSIONS' not in rasterio.env.getenv()
+        with cog_env(CPL_VSIL_CURL_ALLOWED_EXTENSIONS='.tif'):
+            assert rasterio.env.getenv()['CPL_VSIL_CURL_ALLOWED_EXTENSIONS'] == '.tif'
+
+    def test_dataset_pool(self, monkeypatch):
+        from stac import raster
+
+        class Dataset:
+            def __init__(self, href):
+                self.href = href
+                self.closed = False
+
+            def close(self):
+                self.closed = True
+
+        monkeypatch.setattr(raster, 'open_dataset', lambda href, session=None: Dataset(href))
+        pool = raster.DatasetPool(capacity=2)
+
+        with pool.dataset('a.tif') as first:
+            with pool.dataset('a.tif') as second:
+                assert first is not second
+        assert len(pool) == 2 and (pool.hits, pool.misses) == (0, 2)
+
+        with pool.dataset('a.tif') as dataset:
+            assert dataset in (first, second)
+        with pool.dataset('b.tif'):
+            pass
+        assert len(pool) == 2 and (pool.hits, pool.misses) == (1, 3)
+        assert [first.closed, second.closed].count(True) == 1
+
+        with pytest.raises(ValueError):
+            with pool.dataset('b.tif') as dataset:
+                raise ValueError('read failure')
+        assert dataset.closed and len(pool) == 1
+
+        pool.clear()
+        assert len(pool) == 0 and first.closed and second.closed
+
+class TestAsyncStac:
+    def test_async_stac(self, stac_objects):
+        httpx = pytest.importorskip('httpx')
+        import asyncio
+
+        objects = stac_objects['0.9.0']
+
+        def handler(request):
+            path = request.url.path
+            if path == '/collections':
+                data = dict(collections=[objects['collection.json']])
+            elif path == '/collections/my_collection1':
+                data = objects['collection.json']
+            elif path == '/collections/missing':
+                return httpx.Response(404, json={})
+            elif path.startswith('/collections/my_collection1/items/'):
+                data = objects['items.json']['features'][0]
+            elif path == '/search' and request.url.params.get('page') is None:
+                data = dict(objects['items.json'], links=[{'rel': 'next', 'href': f'{url}/search?page=2'}])
+            elif path == '/search':
+                data = dict(objects['items.json'], features=[dict(feature, id=f'{feature["id"]}b')
+                                                             for feature in objects['items.json']['features']])
+            else:
+                data = objects['items.json'] if path == '/search' else objects['catalog.json']
+            return httpx.Response(200, json=data, headers={'content-type': 'application/json'})
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with stac.AsyncSTAC(url, client=client, max_concurrency=2) as s:
+                assert await s.catalog() == ['my_collection1']
+                assert (await s.collection('my_collection1')).id == 'my_collection1'
+                with pytest.raises(KeyError):
+                    await s.collection('missing')
+
+                items = await asyncio.gather(*[s.item('my_collection1', f'feature{i}') for i in range(10)])
+                assert all(item.id == 'feature1' for item in items)
+
+                assert len((await s.search(limit=2)).features) == 2
+                assert [item.id async for item in s.search_iter(limit=2)] == ['feature1', 'feature2', 'feature1b', 'feature2b']
+                assert [item.id async for item in s.search_iter(max_items=3)] == ['feature1', 'feature2', 'feature1b']
+
+        asyncio.run(run())
+
+
 class TestCli:
     def test_catalog(self, stac_objects, requests_mock, runner):
         for k in stac_objects:
@@ -452,5 +1346,90 @@ class TestCli:
             assert 'feature1' in result.output
 
 
+    def test_search_ndjson(self, stac_objects, requests_mock, runner):
+        requests_mock.get(url + '/', json=stac_objects['0.9.0']['catalog.json'],
+                          headers={'content-type':'application/json'})
+        requests_mock.get(url + '/collections', json=dict(collections=[stac_objects['0.9.0']['collection.json']]),
+                          headers={'content-type':'application/json'})
+
+        def callback(request, context):
+            page = int(request.qs.get('page', ['1'])[0])
+            next_link = {'rel': 'next', 'href': f'{url}/search?page={page + 1}'} if page < 3 else None
+            return TestPagination._page(stac_objects, [f'item{page}'], next_link)
+
+        requests_mock.get(re.compile(url + '/search'), json=callback, headers={'content-type':'application/json'})
+
+        result = runner.invoke(stac.cli.search, ['--url', url, '--all', '--fields', 'id,properties.datetime,missing'])
+        assert result.exit_code == 0
+        lines = [json.loads(line) for line in result.output.splitlines()]
+        assert [line['id'] for line in lines] == ['item1', 'item2', 'item3']
+        assert lines[0] == {'id': 'item1', 'properties': {'datetime': lines[0]['properties']['datetime']}}
+
+        result = runner.invoke(stac.cli.search, ['--url', url, '--max-items', 2])
+        assert result.exit_code == 0
+        assert [json.loads(line)['id'] for line in result.output.splitlines()] == ['item1', 'item2']
+
+        result = runner.invoke(stac.cli.search, ['--url', url, '--fields', 'id'])
+        assert result.exit_code == 0
+        assert [json.loads(line) for line in result.output.splitlines()] == [{'id': 'item1'}]
+
+        items_url = url + '/collections/my_collection1/items'
+        requests_mock.get(url + '/collections/my_collection1', json=stac_objects['0.9.0']['collection.json'],
+                          headers={'content-type':'application/json'})
+        requests_mock.get(items_url, json=TestPagination._page(stac_objects, ['a', 'b']),
+                          headers={'content-type':'application/json'})
+        requests_mock.reset_mock()
+
+        result = runner.invoke(stac.cli.items, ['--url', url, '--collection-id', 'my_collection1',
+                                                '--limit', 2, '--all'])
+        assert result.exit_code == 0
+        assert [json.loads(line)['id'] for line in result.output.splitlines()] == ['a', 'b']
+        item_requests = [r for r in requests_mock.request_history if r.path.endswith('/items')]
+        assert len(item_requests) == 1 and 'page' not in item_requests[0].qs
+
+    def test_download(self, stac_objects, requests_mock, runner, tmp_path):
+        items_file = tmp_path / 'items.jsonl'
+        items_file.write_text('\n'.join(json.dumps(item) for item in TestDownload._items(stac_objects)['features']))
+        TestDownload()._mock(requests_mock)
+        requests_mock.head(url + '/data/item2_red.tif', status_code=404)
+        requests_mock.get(url + '/data/item2_red.tif', status_code=404)
+
+        args = ['--items-file', str(items_file), '--assets', 'red', '--dir', str(tmp_path / 'data'), '--workers', 2]
+        result = runner.invoke(stac.cli.download, args)
+        assert result.exit_code == 1
+        assert (tmp_path / 'data' / 'item0' / 'item0_red.tif').read_bytes() == TestDownload.content
+        assert (tmp_path / 'data' / 'item1' / 'item1_red.tif').read_bytes() == TestDownload.content
+        assert not (tmp_path / 'data' / 'item2' / 'item2_red.tif').exists()
+
+        lines = (tmp_path / 'data' / 'manifest.jsonl').read_text().splitlines()
+        manifest = sorted((json.loads(line) for line in lines), key=lambda entry: entry['item'])
+        assert [(entry['item'], entry['asset']) for entry in manifest] == [('item0', 'red'), ('item1', 'red'),
+                                                                          ('item2', 'red')]
+        assert manifest[2]['path'] is None and '404' in manifest[2]['error']
+
+        downloads = len([request for request in requests_mock.request_history if request.method == 'GET'])
+        result = runner.invoke(stac.cli.download, args + ['--max-items', 2])
+        assert result.exit_code == 0
+        assert len([request for request in requests_mock.request_history if request.method == 'GET']) == downloads
+
+        result = runner.invoke(stac.cli.download, ['--assets', 'red'])
+        assert result.exit_code == 2
+
+    def test_download_same_names(self, stac_objects, requests_mock, runner, tmp_path):
+        features = TestDownload._items(stac_objects)['features'][:2]
+        for i, feature in enumerate(features):
+            feature['assets'] = {'red': {'href': f'{url}/data/scene{i}/B04.tif'}}
+        items_file = tmp_path / 'items.jsonl'
+        items_file.write_text('\n'.join(json.dumps(feature) for feature in features))
+        TestDownload()._mock(requests_mock)
+
+        result = runner.invoke(stac.cli.download, ['--items-file', str(items_file), '--dir', str(tmp_path / 'data')])
+        assert result.exit_code == 0
+
+        lines = (tmp_path / 'data' / 'manifest.jsonl').read_text().splitlines()
+        paths = sorted(json.loads(line)['path'] for line in lines)
+        assert paths == [str(tmp_path / 'data' / 'item0' / 'B04.tif'), str(tmp_path / 'data' / 'item1' / 'B04.tif')]
+        assert all(open(path, 'rb').read() == TestDownload.content for path in paths)
+
 if __name__ == '__main__':
     pytest.main(['--color=auto', '--no-cov'])